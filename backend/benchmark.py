@@ -0,0 +1,772 @@
+"""Benchmark harness for the Data Roster backend.
+
+Runs the data products, profile and lineage handlers against in-process
+stand-ins for the Dataplex catalog, Dataplex data scans, Data Lineage and
+BigQuery APIs. The stand-ins serve a synthetic catalog of configurable size
+(BigQuery tables grouped into data products, data scans with job histories
+and a lineage graph between tables), page their results like the real APIs
+and sleep for a configurable latency on every RPC.
+
+Each scenario reports p50/p95 latency, throughput under concurrent load, the
+upstream RPCs issued per request and its traced Python heap peak, next to
+the maximum RSS the process has reached so far:
+
+    python benchmark.py --entries 1000 10000 100000 --latency-ms 20
+
+No Google Cloud credentials or network access are needed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# The benchmark only measures the in-memory paths
+os.environ.pop("CATALOG_STORE_PATH", None)
+os.environ.pop("SCAN_JOB_CACHE_PATH", None)
+
+import main  # noqa: E402
+from google.cloud import datacatalog_lineage_v1, dataplex_v1  # noqa: E402
+from google.api_core import exceptions as google_exceptions  # noqa: E402
+
+PROJECT_ID = "bench-project"
+LOCATION = "us-central1"
+ENTRY_GROUP_SIZE = 1000
+
+
+class FakeBackend:
+    """Shared RPC accounting and latency injection of the fake clients"""
+
+    def __init__(self, latency_seconds: float, jitter: float, seed: int):
+        self.latency_seconds = latency_seconds
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def rpc(self, method: str):
+        with self._lock:
+            self._counts[method] += 1
+            latency = self.latency_seconds * (
+                1 + self._random.uniform(-self.jitter, self.jitter)
+            )
+        if latency > 0:
+            time.sleep(latency)
+
+    def counts(self) -> Counter:
+        with self._lock:
+            return Counter(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class FakePager:
+    """Pages a result list like the SDK pagers: the first page is fetched by
+    the call itself, later pages on demand, each one costing an RPC"""
+
+    def __init__(self, backend: FakeBackend, method: str, items, page_size: int):
+        self._backend = backend
+        self._method = method
+        self._items = items
+        self._page_size = max(1, page_size or 100)
+        backend.rpc(method)
+
+    @property
+    def pages(self):
+        for start in range(0, max(len(self._items), 1), self._page_size):
+            if start:
+                self._backend.rpc(self._method)
+            yield SimpleNamespace(
+                results=self._items[start : start + self._page_size]
+            )
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page.results
+
+
+class SyntheticCatalog:
+    """A generated catalog: tables, data products, scans, jobs and lineage"""
+
+    def __init__(
+        self,
+        entries: int,
+        product_size: int,
+        labelled_ratio: float,
+        job_history: int,
+        upstream_links: int,
+        seed: int,
+    ):
+        rng = random.Random(seed)
+        parent = f"projects/{PROJECT_ID}/locations/{LOCATION}"
+        base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        # 80% of the entries are BigQuery tables in the @bigquery entry group,
+        # the rest are non-BigQuery entries spread over custom entry groups
+        table_count = max(1, int(entries * 0.8))
+        labelled_count = int(table_count * labelled_ratio)
+        self.entry_groups = {f"{parent}/entryGroups/@bigquery": []}
+        self.tables = []
+        for i in range(table_count):
+            table_id = f"table_{i:06d}"
+            dataset_id = f"dataset_{i // 200:04d}"
+            labels = {"env": "prod"}
+            if i < labelled_count:
+                labels.update(
+                    {
+                        "dataproduct-name": f"product_{i // product_size:05d}",
+                        "dataproduct-kind": rng.choice(
+                            ["source-aligned", "consumer-aligned", "aggregate"]
+                        ),
+                        "dataproduct-team": f"team_{rng.randrange(20):02d}",
+                        "domain": f"domain_{rng.randrange(10)}",
+                    }
+                )
+                self.tables.append((dataset_id, table_id))
+            self.entry_groups[f"{parent}/entryGroups/@bigquery"].append(
+                self._entry(
+                    f"{parent}/entryGroups/@bigquery",
+                    f"bigquery.googleapis.com/projects/{PROJECT_ID}"
+                    f"/datasets/{dataset_id}/tables/{table_id}",
+                    "bigquery-table",
+                    "BIGQUERY",
+                    f"projects/{PROJECT_ID}/datasets/{dataset_id}/tables/{table_id}",
+                    table_id,
+                    labels,
+                    base_time + timedelta(seconds=i),
+                )
+            )
+
+        for i in range(entries - table_count):
+            group = f"{parent}/entryGroups/custom_{i // ENTRY_GROUP_SIZE:04d}"
+            self.entry_groups.setdefault(group, []).append(
+                self._entry(
+                    group,
+                    f"asset_{i:06d}",
+                    "generic",
+                    "CUSTOM",
+                    f"//example.com/assets/{i}",
+                    f"asset_{i:06d}",
+                    {},
+                    base_time + timedelta(seconds=i),
+                )
+            )
+
+        # One profile and one quality scan per data product table, each with
+        # a job history in which every third job failed
+        self.scans = []
+        self.jobs = {}
+        self.job_results = {}
+        for dataset_id, table_id in self.tables:
+            resource_name = (
+                f"//bigquery.googleapis.com/projects/{PROJECT_ID}"
+                f"/datasets/{dataset_id}/tables/{table_id}"
+            )
+            for kind in ("profile", "quality"):
+                scan_name = f"{parent}/dataScans/{kind}-{table_id.replace('_', '-')}"
+                self.scans.append(
+                    dataplex_v1.DataScan(
+                        name=scan_name, data={"resource": resource_name}
+                    )
+                )
+                jobs = []
+                for j in range(job_history):
+                    job = dataplex_v1.DataScanJob(
+                        name=f"{scan_name}/jobs/job-{j}",
+                        state=(
+                            dataplex_v1.DataScanJob.State.FAILED
+                            if j % 3 == 2
+                            else dataplex_v1.DataScanJob.State.SUCCEEDED
+                        ),
+                        start_time=base_time - timedelta(days=j),
+                        end_time=base_time - timedelta(days=j) + timedelta(minutes=5),
+                    )
+                    jobs.append(job)
+                    self.job_results[job.name] = (kind, j)
+                self.jobs[scan_name] = jobs
+
+        # Each table reads from a few earlier tables, one process per table
+        self.links = []
+        for i, (dataset_id, table_id) in enumerate(self.tables[1:], start=1):
+            target = f"bigquery:{PROJECT_ID}.{dataset_id}.{table_id}"
+            for _ in range(upstream_links):
+                source_dataset, source_table = self.tables[rng.randrange(i)]
+                self.links.append(
+                    datacatalog_lineage_v1.Link(
+                        name=f"{parent}/links/link-{len(self.links)}",
+                        source={
+                            "fully_qualified_name": (
+                                f"bigquery:{PROJECT_ID}.{source_dataset}.{source_table}"
+                            )
+                        },
+                        target={"fully_qualified_name": target},
+                    )
+                )
+        self.link_processes = {
+            link.name: f"{parent}/processes/process-{link.target.fully_qualified_name}"
+            for link in self.links
+        }
+
+    @staticmethod
+    def _entry(
+        group, entry_id, entry_type, system, resource_name, display_name, labels, ts
+    ):
+        return dataplex_v1.Entry(
+            name=f"{group}/entries/{entry_id}",
+            entry_type=(
+                f"projects/dataplex-types/locations/global/entryTypes/{entry_type}"
+            ),
+            fully_qualified_name=f"{system.lower()}:{resource_name}",
+            entry_source=dataplex_v1.EntrySource(
+                system=system,
+                resource=resource_name,
+                display_name=display_name,
+                labels=labels,
+                create_time=ts,
+                update_time=ts,
+            ),
+        )
+
+
+class FakeCatalogClient:
+    def __init__(self, backend: FakeBackend, catalog: SyntheticCatalog):
+        self._backend = backend
+        self._catalog = catalog
+        # Search results are built once per query so the stand-in's own cost
+        # stays out of the measurements
+        self._search_results = {}
+        self._lock = threading.Lock()
+
+    def list_entry_groups(self, request=None, **kwargs):
+        groups = [
+            dataplex_v1.EntryGroup(name=name) for name in self._catalog.entry_groups
+        ]
+        return FakePager(self._backend, "ListEntryGroups", groups, 100)
+
+    def list_entries(self, request=None, **kwargs):
+        if request.parent not in self._catalog.entry_groups:
+            self._backend.rpc("ListEntries")
+            raise google_exceptions.NotFound(request.parent)
+        return FakePager(
+            self._backend,
+            "ListEntries",
+            self._catalog.entry_groups[request.parent],
+            request.page_size,
+        )
+
+    def search_entries(self, request=None, **kwargs):
+        results = self._search(request.query, request.order_by)
+        return FakePager(self._backend, "SearchEntries", results, request.page_size)
+
+    def _search(self, query: str, order_by: str):
+        with self._lock:
+            results = self._search_results.get((query, order_by))
+        if results is not None:
+            return results
+
+        product = None
+        for term in query.split():
+            if term.startswith("label=dataproduct-name:"):
+                product = term.split(":", 1)[1]
+        results = [
+            dataplex_v1.SearchEntriesResult(
+                dataplex_entry=entry, linked_resource=entry.entry_source.resource
+            )
+            for entries in self._catalog.entry_groups.values()
+            for entry in entries
+            if entry.entry_source.system == "BIGQUERY"
+            and "dataproduct-name" in entry.entry_source.labels
+            and (
+                product is None
+                or entry.entry_source.labels["dataproduct-name"] == product
+            )
+        ]
+        if order_by == "last_modified_timestamp":
+            results.reverse()
+        with self._lock:
+            self._search_results[(query, order_by)] = results
+        return results
+
+
+class FakeDataScanClient:
+    def __init__(self, backend: FakeBackend, catalog: SyntheticCatalog):
+        self._backend = backend
+        self._catalog = catalog
+
+    def list_data_scans(self, request=None, parent=None, **kwargs):
+        return FakePager(self._backend, "ListDataScans", self._catalog.scans, 100)
+
+    def list_data_scan_jobs(self, request=None, **kwargs):
+        return FakePager(
+            self._backend,
+            "ListDataScanJobs",
+            self._catalog.jobs[request.parent],
+            request.page_size,
+        )
+
+    def get_data_scan_job(self, request=None, **kwargs):
+        self._backend.rpc("GetDataScanJob")
+        scan_name = request.name.rsplit("/jobs/", 1)[0]
+        job = next(j for j in self._catalog.jobs[scan_name] if j.name == request.name)
+        kind, age = self._catalog.job_results[request.name]
+        job = dataplex_v1.DataScanJob(job)
+        if kind == "profile":
+            job.data_profile_result = _profile_result(age)
+        else:
+            job.data_quality_result = _quality_result(age)
+        return job
+
+
+def _profile_result(age: int):
+    return {
+        "row_count": 100000 - age,
+        "profile": {
+            "fields": [
+                {
+                    "name": f"column_{c}",
+                    "type_": "STRING",
+                    "mode": "NULLABLE",
+                    "profile": {
+                        "null_ratio": 0.01 * c,
+                        "distinct_ratio": 0.5,
+                        "top_n_values": [
+                            {"value": f"value_{v}", "count": 100 - v, "ratio": 0.01}
+                            for v in range(10)
+                        ],
+                        "string_profile": {
+                            "min_length": 1,
+                            "max_length": 32,
+                            "average_length": 12.5,
+                        },
+                    },
+                }
+                for c in range(20)
+            ]
+        },
+    }
+
+
+def _quality_result(age: int):
+    return {
+        "passed": age % 2 == 0,
+        "score": 90.0 - age,
+        "row_count": 100000 - age,
+        "dimensions": [
+            {"dimension": {"name": name}, "passed": True, "score": 95.0}
+            for name in ("COMPLETENESS", "VALIDITY", "UNIQUENESS")
+        ],
+        "rules": [
+            {
+                "rule": {
+                    "column": f"column_{c}",
+                    "dimension": "COMPLETENESS",
+                    "non_null_expectation": {},
+                },
+                "passed": c % 4 != 0,
+                "pass_ratio": 0.99,
+                "passed_count": 99000,
+                "evaluated_count": 100000,
+                "failing_rows_query": f"SELECT * FROM t WHERE column_{c} IS NULL",
+            }
+            for c in range(10)
+        ],
+    }
+
+
+class FakeLineageClient:
+    def __init__(self, backend: FakeBackend, catalog: SyntheticCatalog):
+        self._backend = backend
+        self._catalog = catalog
+        self._by_source = {}
+        self._by_target = {}
+        for link in catalog.links:
+            source = link.source.fully_qualified_name
+            target = link.target.fully_qualified_name
+            self._by_source.setdefault(source, []).append(link)
+            self._by_target.setdefault(target, []).append(link)
+
+    def search_links(self, request=None, **kwargs):
+        if request.target.fully_qualified_name:
+            links = self._by_target.get(request.target.fully_qualified_name, [])
+        else:
+            links = self._by_source.get(request.source.fully_qualified_name, [])
+        return FakePager(self._backend, "SearchLinks", links, 100)
+
+    def batch_search_link_processes(self, request=None, **kwargs):
+        processes = {}
+        for link_name in request.links:
+            processes.setdefault(self._catalog.link_processes[link_name], []).append(
+                {"link": link_name}
+            )
+        return FakePager(
+            self._backend,
+            "BatchSearchLinkProcesses",
+            [
+                datacatalog_lineage_v1.ProcessLinks(process=process, links=links)
+                for process, links in processes.items()
+            ],
+            100,
+        )
+
+    def get_process(self, request=None, **kwargs):
+        self._backend.rpc("GetProcess")
+        return datacatalog_lineage_v1.Process(
+            name=request.name,
+            display_name=f"INSERT INTO ... SELECT ... -- {request.name}",
+            attributes={
+                "bigquery_job_id": request.name.rsplit("/", 1)[-1],
+                "start_time": "2024-01-01T00:00:00Z",
+            },
+        )
+
+
+class FakeBigQueryClient:
+    """Every table has 19 STRING columns and a repeated RECORD column"""
+
+    def __init__(self, backend: FakeBackend, catalog: SyntheticCatalog):
+        self._backend = backend
+        self._datasets = {}
+        for dataset_id, table_id in catalog.tables:
+            self._datasets.setdefault(f"{PROJECT_ID}.{dataset_id}", []).append(
+                table_id
+            )
+
+    def get_table(self, table, **kwargs):
+        self._backend.rpc("GetTable")
+        return SimpleNamespace(
+            description="Synthetic table",
+            schema=[
+                SimpleNamespace(
+                    name=f"column_{c}",
+                    field_type="STRING",
+                    mode="NULLABLE",
+                    description="",
+                    fields=(),
+                )
+                for c in range(19)
+            ]
+            + [
+                SimpleNamespace(
+                    name="attributes",
+                    field_type="RECORD",
+                    mode="REPEATED",
+                    description="",
+                    fields=[
+                        SimpleNamespace(
+                            name=name,
+                            field_type="STRING",
+                            mode="NULLABLE",
+                            description="",
+                            fields=(),
+                        )
+                        for name in ("key", "value")
+                    ],
+                )
+            ],
+        )
+
+    def query_and_wait(self, query, job_config=None, **kwargs):
+        self._backend.rpc("Query")
+        dataset = query.split("`")[1].replace(".__TABLES__", "")
+        tables = self._datasets.get(dataset)
+        if tables is None:
+            raise google_exceptions.NotFound(f"Dataset {dataset} not found")
+        if "INFORMATION_SCHEMA" not in query:
+            return [
+                SimpleNamespace(table_id=table_id, last_modified_time=1)
+                for table_id in tables
+            ]
+
+        parameters = {p.name: p for p in job_config.query_parameters}
+        if not parameters["all_tables"].value:
+            tables = [t for t in tables if t in parameters["tables"].values]
+        columns = [(f"column_{c}", "STRING") for c in range(19)] + [
+            ("attributes", "ARRAY<STRUCT<key STRING, value STRING>>"),
+            ("attributes.key", "STRING"),
+            ("attributes.value", "STRING"),
+        ]
+        return [
+            SimpleNamespace(
+                table_name=table_id,
+                column_name=path.split(".")[0],
+                is_nullable="YES",
+                ordinal_position=position,
+                field_path=path,
+                data_type=data_type,
+                description=None,
+                last_modified_time=1,
+                table_description='"Synthetic table"',
+            )
+            for table_id in tables
+            for position, (path, data_type) in enumerate(columns, start=1)
+        ]
+
+
+def install_fakes(backend: FakeBackend, catalog: SyntheticCatalog):
+    """Point the shared client registry at the fake clients"""
+    main.clients._clients.clear()
+    main.clients._credentials = SimpleNamespace(valid=True, expiry=None)
+    main.clients._clients.update(
+        {
+            "catalog": main._instrument(
+                FakeCatalogClient(backend, catalog), "catalog"
+            ),
+            "data_scans": main._instrument(
+                FakeDataScanClient(backend, catalog), "data_scans"
+            ),
+            "lineage": main._instrument(
+                FakeLineageClient(backend, catalog), "lineage"
+            ),
+            ("bigquery", PROJECT_ID): main._instrument(
+                FakeBigQueryClient(backend, catalog), "bigquery"
+            ),
+        }
+    )
+
+
+def reset_caches():
+    """Drop every server-side cache so the next request starts cold"""
+    main.catalog_cache.invalidate()
+    main.catalog_sync.invalidate()
+    main.table_index.invalidate()
+    main.data_scan_index.invalidate()
+    main.search_index.invalidate()
+    main.scan_job_cache.clear()
+    main.lineage_process_cache.clear()
+    main.table_schemas.clear()
+    main.product_rollups.invalidate()
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run_scenario(name, backend, make_request, requests, concurrency, trace):
+    """Issue `requests` calls, at most `concurrency` at a time, and measure them"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await make_request(i)
+            except Exception as e:
+                errors += 1
+                main.logger.warning(f"{name} request failed: {str(e)}")
+            latencies.append(time.perf_counter() - started)
+
+    backend.reset()
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    traced_peak = None
+    if trace:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    rpcs = backend.counts()
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "throughput_rps": requests / elapsed if elapsed else None,
+        "rpcs": dict(sorted(rpcs.items())),
+        "rpcs_per_request": sum(rpcs.values()) / requests,
+        "traced_peak_mb": traced_peak / 1e6 if traced_peak is not None else None,
+        # ru_maxrss never decreases: this is the peak of the whole run so far,
+        # not of this scenario
+        "process_max_rss_mb": (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        ),
+    }
+
+
+async def benchmark_catalog(args, entries):
+    backend = FakeBackend(args.latency_ms / 1000, args.jitter, args.seed)
+    generation_started = time.perf_counter()
+    catalog = SyntheticCatalog(
+        entries,
+        product_size=args.product_size,
+        labelled_ratio=args.labelled_ratio,
+        job_history=args.job_history,
+        upstream_links=args.upstream_links,
+        seed=args.seed,
+    )
+    print(
+        f"\n{entries} entries: {len(catalog.tables)} data product tables, "
+        f"{len(catalog.scans)} scans, {len(catalog.links)} lineage links "
+        f"(generated in {time.perf_counter() - generation_started:.1f}s)"
+    )
+    install_fakes(backend, catalog)
+    main.CATALOG_CRAWL_MODE = args.crawl_mode
+    rng = random.Random(args.seed)
+    table_ids = [rng.choice(catalog.tables)[1] for _ in range(args.requests)]
+    # Searches for a product name, a table name prefix and a team and kind
+    product_count = len(catalog.tables) // args.product_size + 1
+    queries = [
+        rng.choice(
+            [
+                f"product_{rng.randrange(product_count):05d}",
+                table_id[:-2],
+                f"team_{rng.randrange(20):02d} aggregate",
+            ]
+        )
+        for table_id in table_ids
+    ]
+    # Rollups of one page of 20 product cards
+    card_pages = []
+    for _ in range(args.requests):
+        first = rng.randrange(max(1, product_count - 20))
+        card_pages.append(
+            ",".join(f"product_{p:05d}" for p in range(first, first + 20))
+        )
+
+    async def crawl(_):
+        reset_caches()
+        await main.get_data_products(project_id=PROJECT_ID, location=LOCATION)
+
+    async def list_products(_):
+        await main.get_data_products(project_id=PROJECT_ID, location=LOCATION)
+
+    async def list_page(_):
+        await main.get_data_products(
+            project_id=PROJECT_ID,
+            location=LOCATION,
+            fields="id,name,kind,team,tags,component_count",
+            limit=100,
+        )
+
+    async def search(i):
+        await main.search_data_products(
+            project_id=PROJECT_ID, location=LOCATION, q=queries[i]
+        )
+
+    async def profile(i):
+        await main.get_table_profile(
+            table_ids[i], PROJECT_ID, LOCATION, history=args.profile_history
+        )
+
+    async def rollups(i):
+        await main.get_data_product_rollups(PROJECT_ID, LOCATION, ids=card_pages[i])
+
+    async def lineage(i):
+        await main.get_table_lineage(table_ids[i], PROJECT_ID, LOCATION)
+
+    scenarios = [
+        ("data_products_cold", crawl, args.crawl_iterations, 1),
+        ("data_products_warm", list_products, args.requests, args.concurrency),
+        ("data_products_page", list_page, args.requests, args.concurrency),
+        ("search", search, args.requests, args.concurrency),
+        ("profile_cold", profile, args.requests, args.concurrency),
+        ("profile_warm", profile, args.requests, args.concurrency),
+        ("lineage_cold", lineage, args.requests, args.concurrency),
+        ("lineage_warm", lineage, args.requests, args.concurrency),
+        ("rollups_cold", rollups, args.requests, args.concurrency),
+        ("rollups_warm", rollups, args.requests, args.concurrency),
+    ]
+
+    results = []
+    for name, make_request, requests, concurrency in scenarios:
+        if name.endswith("_cold") and name != "data_products_cold":
+            # Keep the catalog snapshot and table index, drop the rest
+            main.data_scan_index.invalidate()
+            main.scan_job_cache.clear()
+            main.lineage_process_cache.clear()
+            main.table_schemas.clear()
+            main.product_rollups.invalidate()
+        result = await run_scenario(
+            name, backend, make_request, requests, concurrency, args.trace_memory
+        )
+        result["entries"] = entries
+        results.append(result)
+        _print_result(result)
+    return results
+
+
+def _print_result(result):
+    traced = (
+        f" heap={result['traced_peak_mb']:.1f}MB"
+        if result["traced_peak_mb"] is not None
+        else ""
+    )
+    print(
+        f"  {result['scenario']:<20} n={result['requests']:<4} "
+        f"c={result['concurrency']:<3} p50={result['p50_ms']:9.1f}ms "
+        f"p95={result['p95_ms']:9.1f}ms {result['throughput_rps']:8.1f} req/s "
+        f"rpc/req={result['rpcs_per_request']:7.1f}{traced} "
+        f"max_rss={result['process_max_rss_mb']:.0f}MB errors={result['errors']}"
+    )
+    print(f"    {result['rpcs']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--entries",
+        type=int,
+        nargs="+",
+        default=[1000, 10000],
+        help="catalog sizes to benchmark, in entries (e.g. 1000 10000 100000)",
+    )
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--jitter", type=float, default=0.2, help="relative latency jitter"
+    )
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--crawl-iterations", type=int, default=3)
+    parser.add_argument(
+        "--crawl-mode", choices=["search", "bigquery", "full"], default="search"
+    )
+    parser.add_argument("--product-size", type=int, default=5)
+    parser.add_argument("--labelled-ratio", type=float, default=0.5)
+    parser.add_argument("--job-history", type=int, default=10)
+    parser.add_argument("--profile-history", type=int, default=1)
+    parser.add_argument("--upstream-links", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--no-trace-memory",
+        dest="trace_memory",
+        action="store_false",
+        help="skip the per-scenario traced Python heap peak, which slows every "
+        "scenario; the process max RSS is still reported",
+    )
+    parser.add_argument("--json", help="write the results to this JSON file")
+    return parser.parse_args(argv)
+
+
+async def run(args):
+    results = []
+    for entries in args.entries:
+        results.extend(await benchmark_catalog(args, entries))
+    main.io_executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main.logger.setLevel("WARNING")
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
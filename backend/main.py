@@ -1,16 +1,22 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
-from typing import List, Dict
-from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
+from typing import List, Dict, NamedTuple, Optional
+from datetime import datetime, timedelta
 from google.cloud import dataplex_v1
 from google.api_core import retry, exceptions as google_exceptions
 from pydantic import BaseModel
 from google.auth import default
+from google.auth.transport import requests as google_auth_requests
 import logging
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict
 from google.cloud.dataplex_v1.types import (
-    GetDataScanRequest,
     ListDataScanJobsRequest,
     GetDataScanJobRequest,
     DataScanJob,
@@ -21,11 +27,144 @@ import re
 from google.cloud import bigquery
 from google.api_core.exceptions import NotFound
 import os
+import asyncio
+import base64
+import bisect
+import heapq
+import contextvars
+import functools
+import json
+import orjson
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Interval at which the shared credentials are checked and refreshed ahead of
+# their expiry
+CREDENTIALS_REFRESH_SECONDS = float(os.getenv("CREDENTIALS_REFRESH_SECONDS", "300"))
+
+# Blocking Google API calls run on a dedicated thread pool; each upstream RPC
+# and each request as a whole are bounded by a timeout
+IO_THREAD_POOL_SIZE = int(os.getenv("IO_THREAD_POOL_SIZE", "32"))
+RPC_TIMEOUT_SECONDS = float(os.getenv("RPC_TIMEOUT_SECONDS", "30"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
+
+# Server-side catalog snapshot cache: snapshots older than the TTL are served
+# stale while being refreshed in the background
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+CATALOG_CACHE_REFRESH_INTERVAL_SECONDS = float(
+    os.getenv("CATALOG_CACHE_REFRESH_INTERVAL_SECONDS", "60")
+)
+
+# Maximum number of entry groups listed concurrently during a catalog crawl
+CATALOG_CRAWL_CONCURRENCY = int(os.getenv("CATALOG_CRAWL_CONCURRENCY", "8"))
+
+# Incremental catalog sync: entries modified since the last sync watermark
+# (minus an overlap absorbing search indexing delays) are re-read, and a full
+# crawl still runs periodically to pick up deletions
+CATALOG_FULL_SYNC_SECONDS = float(os.getenv("CATALOG_FULL_SYNC_SECONDS", "3600"))
+CATALOG_SYNC_OVERLAP_SECONDS = float(os.getenv("CATALOG_SYNC_OVERLAP_SECONDS", "300"))
+
+# Number of data products per line when streaming a cached snapshot
+STREAM_SNAPSHOT_BATCH_SIZE = 50
+
+# Pagination and sparse fieldsets of /api/data-products
+DATA_PRODUCTS_PAGE_SIZE_MAX = int(os.getenv("DATA_PRODUCTS_PAGE_SIZE_MAX", "500"))
+DATA_PRODUCT_FIELDS = {
+    "id",
+    "name",
+    "kind",
+    "team",
+    "tags",
+    "created_at",
+    "components",
+    "component_count",
+}
+
+# How the catalog is read: "search" (predicates pushed down to a catalog
+# search), "bigquery" (only the @bigquery entry group) or "full" (every entry
+# group in the location)
+CATALOG_CRAWL_MODE = os.getenv("CATALOG_CRAWL_MODE", "search")
+
+# Table entry index shared by the profile and lineage endpoints: rebuilt after
+# the TTL, and re-listed on a lookup miss at most once per miss interval
+TABLE_INDEX_TTL_SECONDS = float(os.getenv("TABLE_INDEX_TTL_SECONDS", "900"))
+TABLE_INDEX_MISS_REFRESH_SECONDS = float(
+    os.getenv("TABLE_INDEX_MISS_REFRESH_SECONDS", "60")
+)
+
+# Index of data scans by scanned BigQuery resource, rebuilt after the TTL
+DATA_SCAN_INDEX_TTL_SECONDS = float(os.getenv("DATA_SCAN_INDEX_TTL_SECONDS", "300"))
+
+# Table schemas are read a dataset at a time from INFORMATION_SCHEMA and
+# cached; a dataset's table modification times are checked again after this
+# interval, and only modified tables are read again
+SCHEMA_CACHE_CHECK_SECONDS = float(os.getenv("SCHEMA_CACHE_CHECK_SECONDS", "300"))
+SCHEMA_CACHE_MAX_DATASETS = int(os.getenv("SCHEMA_CACHE_MAX_DATASETS", "500"))
+
+# Upper bound for the number of succeeded jobs per scan returned by the
+# profile endpoint, and the page size used while looking for them
+PROFILE_HISTORY_MAX = int(os.getenv("PROFILE_HISTORY_MAX", "30"))
+PROFILE_JOBS_PAGE_SIZE = 10
+
+# Maximum number of scan job listings and fetches issued concurrently, across
+# all requests
+SCAN_JOB_FETCH_CONCURRENCY = int(os.getenv("SCAN_JOB_FETCH_CONCURRENCY", "16"))
+
+# Cache of formatted results of succeeded scan jobs, bounded by entry count
+# and approximate size; persisted to SQLite when a path is configured
+SCAN_JOB_CACHE_MAX_ENTRIES = int(os.getenv("SCAN_JOB_CACHE_MAX_ENTRIES", "2000"))
+SCAN_JOB_CACHE_MAX_BYTES = int(
+    os.getenv("SCAN_JOB_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+SCAN_JOB_CACHE_PATH = os.getenv("SCAN_JOB_CACHE_PATH")
+
+# Optional on-disk store (SQLite) persisting catalog snapshots, the table and
+# scan indexes, scan job results and lineage edges across restarts; stored
+# lineage edges are reused until they are older than the lineage TTL
+CATALOG_STORE_PATH = os.getenv("CATALOG_STORE_PATH")
+CATALOG_STORE_LINEAGE_TTL_SECONDS = float(
+    os.getenv("CATALOG_STORE_LINEAGE_TTL_SECONDS", "900")
+)
+
+# Lineage: links per BatchSearchLinkProcesses call (API maximum is 100),
+# concurrent lineage RPCs across all requests and the process metadata cache
+LINEAGE_LINKS_PER_BATCH = 100
+LINEAGE_FETCH_CONCURRENCY = int(os.getenv("LINEAGE_FETCH_CONCURRENCY", "16"))
+LINEAGE_PROCESS_CACHE_MAX_ENTRIES = int(
+    os.getenv("LINEAGE_PROCESS_CACHE_MAX_ENTRIES", "5000")
+)
+LINEAGE_PROCESS_CACHE_TTL_SECONDS = float(
+    os.getenv("LINEAGE_PROCESS_CACHE_TTL_SECONDS", "3600")
+)
+
+# Upper bounds for the multi-hop lineage graph endpoint
+LINEAGE_GRAPH_MAX_DEPTH = int(os.getenv("LINEAGE_GRAPH_MAX_DEPTH", "10"))
+LINEAGE_GRAPH_TIME_BUDGET_SECONDS = float(
+    os.getenv("LINEAGE_GRAPH_TIME_BUDGET_SECONDS", "20")
+)
+
+# Maximum number of data product components resolved concurrently, across
+# all product details and rollup requests
+PRODUCT_DETAILS_CONCURRENCY = int(os.getenv("PRODUCT_DETAILS_CONCURRENCY", "8"))
+
+# Product quality and profile rollups older than this are refreshed in the
+# background; number of null-ratio hotspots reported per data product
+PRODUCT_ROLLUP_TTL_SECONDS = float(os.getenv("PRODUCT_ROLLUP_TTL_SECONDS", "300"))
+PRODUCT_ROLLUP_NULL_HOTSPOTS = 5
+
+# Prometheus metrics served on /metrics, and optional OpenTelemetry spans for
+# upstream RPCs and handler phases (requires the opentelemetry-api package)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+OTEL_TRACING_ENABLED = os.getenv("OTEL_TRACING_ENABLED", "false").lower() == "true"
+
 app = FastAPI()
 
 # Configure CORS
@@ -43,691 +182,4323 @@ class DataplexConfig(BaseModel):
     location: str
 
 
-def is_bigquery_entry(entry: dataplex_v1.Entry) -> bool:
-    """Check if the entry is from BigQuery"""
-    return (
-        hasattr(entry, "entry_source")
-        and hasattr(entry.entry_source, "system")
-        and entry.entry_source.system.upper() == "BIGQUERY"
-    )
+def _json_default(value):
+    """Encode values orjson does not support natively (e.g. proto maps)"""
+    return jsonable_encoder(value)
 
 
-def get_data_product_name(entry: dataplex_v1.Entry) -> str:
-    """Extract data product name from entry labels"""
-    if (
-        hasattr(entry, "entry_source")
-        and hasattr(entry.entry_source, "labels")
-        and "dataproduct-name" in entry.entry_source.labels
-    ):
-        return entry.entry_source.labels["dataproduct-name"]
-    return None
+def _dumps(payload) -> bytes:
+    """Serialize a payload to JSON bytes with orjson"""
+    return orjson.dumps(payload, default=_json_default)
 
 
-def transform_dataplex_entry(entry: dataplex_v1.Entry) -> Dict:
-    """Transform a Dataplex entry into our component format"""
-    entry_source = entry.entry_source if hasattr(entry, "entry_source") else None
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
 
-    return {
-        "id": entry.name.split("/")[-1],
-        "name": (
-            entry_source.display_name
-            if entry_source and hasattr(entry_source, "display_name")
-            else entry.name.split("/")[-1]
-        ),
-        "type": (
-            entry.entry_type.split("/")[-1]
-            if entry and hasattr(entry, "entry_type")
-            else "Unknown"
-        ),
-        "created_at": (
-            entry_source.create_time.isoformat()
-            if entry_source and hasattr(entry_source, "create_time")
-            else datetime.now().isoformat()
-        ),
-        "source": {
-            "system": (
-                entry_source.system
-                if entry_source and hasattr(entry_source, "system")
-                else "Unknown"
-            ),
-            "resource": (
-                entry_source.resource
-                if entry_source and hasattr(entry_source, "resource")
-                else ""
-            ),
-            "labels": (
-                entry_source.labels
-                if entry_source and hasattr(entry_source, "labels")
-                else {}
-            ),
-        },
-        "labels": (
-            entry_source.labels
-            if entry_source and hasattr(entry_source, "labels")
-            else {}
-        ),
-    }
+    Handlers return it explicitly, which also skips FastAPI's
+    jsonable_encoder pass; bytes content is taken as already serialized JSON
+    and sent as is.
+    """
 
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return _dumps(content)
 
-def transform_data_product(name: str, components: List[Dict]) -> Dict:
-    """Transform a collection of entries into a data product"""
-    # Get the first component that has a dataproduct-kind label, or
-    # default to source-aligned
-    data_product_kind = next(
-        (
-            comp["labels"].get("dataproduct-kind", "source-aligned")
-            for comp in components
-            if "dataproduct-kind" in comp.get("labels", {})
-        ),
-        next(
-            (
-                comp.get("source", {})
-                .get("labels", {})
-                .get("dataproduct-kind", "source-aligned")
-                for comp in components
-            ),
-            "source-aligned",
-        ),
-    )
 
-    # Get team from dataproduct-team label
-    team = next(
-        (
-            comp["labels"].get("dataproduct-team", "Unassigned")
-            for comp in components
-            if "dataproduct-team" in comp.get("labels", {})
-        ),
-        next(
-            (
-                comp.get("source", {})
-                .get("labels", {})
-                .get("dataproduct-team", "Unassigned")
-                for comp in components
-            ),
-            "Unassigned",
-        ),
-    )
+_METRIC_HELP = {
+    "data_roster_http_requests_total": (
+        "counter",
+        "HTTP requests by handler, method and status",
+    ),
+    "data_roster_http_request_duration_seconds": (
+        "histogram",
+        "HTTP request duration by handler, including streamed bodies",
+    ),
+    "data_roster_http_requests_in_flight": (
+        "gauge",
+        "HTTP requests being served",
+    ),
+    "data_roster_rpc_duration_seconds": (
+        "histogram",
+        "Upstream Google API call duration by method, one sample per page",
+    ),
+    "data_roster_rpc_errors_total": (
+        "counter",
+        "Failed upstream Google API calls by method and error",
+    ),
+    "data_roster_rpcs_in_flight": (
+        "gauge",
+        "Upstream Google API calls in progress by method",
+    ),
+    "data_roster_phase_duration_seconds": (
+        "histogram",
+        "Duration of handler and background phases",
+    ),
+    "data_roster_cache_lookups_total": (
+        "counter",
+        "Server-side cache lookups by cache and result",
+    ),
+    "data_roster_single_flight_calls_total": (
+        "counter",
+        "Calls entering the single-flight layer by kind",
+    ),
+    "data_roster_single_flight_executions_total": (
+        "counter",
+        "Executions actually run by the single-flight layer by kind",
+    ),
+    "data_roster_single_flight_coalesced_total": (
+        "counter",
+        "Calls that waited for an identical in-flight execution by kind",
+    ),
+    "data_roster_single_flight_in_flight": (
+        "gauge",
+        "Single-flight executions in progress by kind",
+    ),
+}
 
-    return {
-        "id": name,
-        "name": name,
-        "kind": data_product_kind,
-        "team": team,
-        "components": components,
-        "tags": list(
-            set(
-                tag
-                for comp in components
-                for tag in comp.get("labels", {}).values()
-                if tag != name
-                and tag != data_product_kind
-                and tag != team  # Also exclude team from tags
-            )
-        ),
-        "created_at": min(
-            (comp["created_at"] for comp in components),
-            default=datetime.now().isoformat(),
-        ),
-    }
+_HISTOGRAM_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
 
 
-@app.get("/api/data-products")
-async def get_data_products(project_id: str, location: str):
-    try:
-        # Get default credentials
-        credentials, _ = default()
+class Metrics:
+    """Process-wide counters, gauges and histograms with labels, rendered in
+    the Prometheus text format.
 
-        # Initialize the Dataplex client with credentials
-        client = dataplex_v1.CatalogServiceClient(credentials=credentials)
+    When disabled every update returns immediately. When a tracer is given,
+    timed sections are also recorded as OpenTelemetry spans.
+    """
 
-        # First, list all entry groups in the location
-        parent_location = f"projects/{project_id}/locations/{location}"
-        # logger.info(f"Listing entry groups in: {parent_location}")
+    def __init__(self, enabled: bool, tracer=None):
+        self.enabled = enabled
+        self._tracer = tracer
+        # Whether any instrumentation has to run at all
+        self.active = enabled or tracer is not None
+        self._counters = defaultdict(float)
+        self._gauges = defaultdict(float)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1.0):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, labels)] += value
+
+    def gauge_add(self, name: str, labels: tuple = (), value: float = 1.0):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, labels)] += value
+
+    def observe(self, name: str, labels: tuple, value: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = {
+                    "buckets": [0] * len(_HISTOGRAM_BUCKETS),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(_HISTOGRAM_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+            histogram["sum"] += value
+            histogram["count"] += 1
 
+    @contextmanager
+    def timer(self, name: str, labels: tuple, span_name: str = None):
+        """Observe the duration of a block, and trace it when tracing is on"""
+        if not self.active:
+            yield
+            return
+
+        span = None
+        if self._tracer is not None:
+            span = self._tracer.start_as_current_span(span_name or name)
+            span.__enter__()
+        started = time.perf_counter()
         try:
-            # Get all entry groups
-            entry_groups_request = dataplex_v1.ListEntryGroupsRequest(
-                parent=parent_location
-            )
-            entry_groups_iterator = client.list_entry_groups(
-                request=entry_groups_request
-            )
+            yield
+        finally:
+            self.observe(name, labels, time.perf_counter() - started)
+            if span is not None:
+                span.__exit__(*sys.exc_info())
 
-            # Group entries by data product name
-            data_product_components = defaultdict(list)
+    def phase(self, phase: str):
+        """Time a handler or background phase"""
+        return self.timer(
+            "data_roster_phase_duration_seconds", (("phase", phase),), phase
+        )
 
-            # Iterate through each entry group
-            for entry_group in entry_groups_iterator:
-                # logger.info(f"Processing entry group: {entry_group.name}")
+    def cache_lookup(self, cache: str, result: str, count: int = 1):
+        if count:
+            self.inc(
+                "data_roster_cache_lookups_total",
+                (("cache", cache), ("result", result)),
+                count,
+            )
 
-                # List entries in this entry group
-                @retry.Retry(
-                    predicate=retry.if_exception_type(
-                        google_exceptions.ServiceUnavailable
+    def render(self, extra_samples=()) -> str:
+        """Render every metric, plus extra (name, labels, value) samples"""
+        with self._lock:
+            samples = defaultdict(list)
+            for (name, labels), value in self._counters.items():
+                samples[name].append((name, labels, value))
+            for (name, labels), value in self._gauges.items():
+                samples[name].append((name, labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                cumulative = 0
+                for bound, count in zip(_HISTOGRAM_BUCKETS, histogram["buckets"]):
+                    cumulative += count
+                    samples[name].append(
+                        (f"{name}_bucket", labels + (("le", repr(bound)),), cumulative)
                     )
+                samples[name].append(
+                    (f"{name}_bucket", labels + (("le", "+Inf"),), histogram["count"])
                 )
-                def list_entries():
-                    request = dataplex_v1.ListEntriesRequest(
-                        parent=entry_group.name,
-                        page_size=100,
-                    )
-                    return client.list_entries(request=request)
+                samples[name].append((f"{name}_sum", labels, histogram["sum"]))
+                samples[name].append((f"{name}_count", labels, histogram["count"]))
+        for name, labels, value in extra_samples:
+            samples[name].append((name, labels, value))
 
-                try:
-                    # Get entries for this group
-                    entries_iterator = list_entries()
-
-                    for entry in entries_iterator:
-                        try:
-                            # Only process BigQuery entries that belong
-                            # to a data product
-                            if is_bigquery_entry(entry):
-                                data_product_name = get_data_product_name(entry)
-                                if data_product_name:
-                                    # logger.info(
-                                    #     "Processing component for data "
-                                    #     f"product '{data_product_name}': "
-                                    #     f"{entry.name}"
-                                    # )
-                                    component = transform_dataplex_entry(entry)
-                                    data_product_components[data_product_name].append(
-                                        component
-                                    )
-                                else:
-                                    logger.debug(
-                                        "Skipping entry without data "
-                                        f"product label: {entry.name}"
-                                    )
-                            else:
-                                logger.debug(
-                                    "Skipping non-BigQuery entry: " f"{entry.name}"
-                                )
-                        except Exception as transform_error:
-                            logger.error(
-                                "Error transforming entry "
-                                f"{entry.name}: {str(transform_error)}"
-                            )
-                            continue
+        lines = []
+        for name in sorted(samples):
+            kind, description = _METRIC_HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples[name]:
+                lines.append(
+                    f"{sample_name}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
 
-                except google_exceptions.PermissionDenied as e:
-                    logger.warning(
-                        "Permission denied for entry group "
-                        f"{entry_group.name}: {str(e)}"
-                    )
-                    continue
-                except Exception as e:
-                    logger.error(
-                        "Error processing entry group " f"{entry_group.name}: {str(e)}"
-                    )
-                    continue
 
-            # Transform components into data products
-            data_products = [
-                transform_data_product(name, components)
-                for name, components in data_product_components.items()
-            ]
+def _format_value(value) -> str:
+    """Format a sample value without losing precision"""
+    if isinstance(value, int):
+        return str(int(value))
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
 
-            # logger.info(
-            #     "Successfully fetched "
-            #     f"{len(data_products)} data products with "
-            #     f"{sum(len(dp['components']) for dp in data_products)} "
-            #     "total components"
-            # )
-            return {"data_products": data_products}
 
-        except google_exceptions.PermissionDenied as e:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Permission denied accessing Dataplex: {str(e)}",
-            )
-        except google_exceptions.NotFound as e:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Project or location not found: {str(e)}",
-            )
-        except Exception as e:
-            logger.error(f"Error fetching from Dataplex: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error fetching from Dataplex: {str(e)}",
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                key,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
             )
+            for key, value in labels
+        )
+        + "}"
+    )
 
-    except Exception as e:
-        logger.error(f"Error connecting to Dataplex: {str(e)}")
-        raise HTTPException(
-            status_code=500, detail=f"Error connecting to Dataplex: {str(e)}"
+
+def _create_tracer():
+    """Return an OpenTelemetry tracer if tracing is enabled and available"""
+    if not OTEL_TRACING_ENABLED:
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.warning(
+            "OTEL_TRACING_ENABLED is set but opentelemetry-api is not installed"
         )
+        return None
+    return trace.get_tracer("data-roster")
 
 
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+metrics = Metrics(enabled=METRICS_ENABLED, tracer=_create_tracer())
 
 
-def _get_table_schema(table_fqn, project_id):
-    """Get schema information for a BigQuery table using the BigQuery client"""
-    try:
-        client = bigquery.Client(project=project_id)
-        table = client.get_table(table_fqn)
-
-        schema_fields = []
-        for field in table.schema:
-            schema_fields.append(
-                {
-                    "name": field.name,
-                    "type": field.field_type,
-                    "mode": field.mode,
-                    "description": field.description or "",
-                }
-            )
+def _timed_rpc(method: str, func, *args, **kwargs):
+    """Call an upstream RPC, recording its duration, errors and concurrency.
 
-        return {"fields": schema_fields, "description": table.description or ""}
-    except NotFound:
-        logger.error(f"Table {table_fqn} not found")
-        return None
+    SDK pagers fetch later pages lazily through their _method attribute,
+    which is wrapped too so every page is recorded as a call.
+    """
+    labels = (("method", method),)
+    metrics.gauge_add("data_roster_rpcs_in_flight", labels, 1)
+    try:
+        with metrics.timer("data_roster_rpc_duration_seconds", labels, method):
+            result = func(*args, **kwargs)
     except Exception as e:
-        logger.error(f"Error fetching schema for {table_fqn}: {str(e)}")
-        return None
+        metrics.inc(
+            "data_roster_rpc_errors_total", labels + (("error", type(e).__name__),)
+        )
+        raise
+    finally:
+        metrics.gauge_add("data_roster_rpcs_in_flight", labels, -1)
 
+    if callable(getattr(result, "_method", None)):
+        result._method = functools.partial(_timed_rpc, method, result._method)
+    return result
 
-@app.get("/api/data-products/{table_id}/profile")
-async def get_table_profile(table_id: str, project_id: str, location: str):
-    """Get profile and quality information for a BigQuery table"""
-    try:
-        # Find the table entry to get the correct dataset (existing code)
-        catalog_client = dataplex_v1.CatalogServiceClient()
-        parent = f"projects/{project_id}/locations/{location}/entryGroups/@bigquery"
-        request = dataplex_v1.ListEntriesRequest(parent=parent)
-        entries = catalog_client.list_entries(request=request)
 
-        table_entry = None
-        for entry in entries:
-            if table_id in entry.name and entry.name.endswith(f"/tables/{table_id}"):
-                table_entry = entry
-                break
+class InstrumentedClient:
+    """Proxy recording every public method call of a Google API client as an
+    upstream RPC named "<service>.<method>" """
 
-        if not table_entry:
-            logger.warning(f"No matching entry found for table_id: {table_id}")
-            return {"data_profile": [], "data_quality": [], "schema": None}
+    _UNTIMED = {"close"}
 
-        # Extract dataset from the entry resource
-        resource_parts = table_entry.entry_source.resource.split("/")
-        dataset_id = resource_parts[-3]
+    def __init__(self, client, service: str):
+        self._client = client
+        self._service = service
 
-        # Construct the fully qualified name
-        table_fqn = f"{project_id}.{dataset_id}.{table_id}"
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name.startswith("_") or name in self._UNTIMED or not callable(attribute):
+            return attribute
+        return functools.partial(_timed_rpc, f"{self._service}.{name}", attribute)
 
-        # Get schema information
-        schema_info = _get_table_schema(table_fqn, project_id)
 
-        # Get existing profile and quality data
-        scan_client = dataplex_v1.DataScanServiceClient()
-        results = _get_table_profile_quality(
-            True, table_fqn, project_id, location, scan_client
-        )
+def _instrument(client, service: str):
+    if not metrics.active:
+        return client
+    return InstrumentedClient(client, service)
 
-        # Add schema information to the response
-        return {
-            "data_profile": results["data_profile"],
-            "data_quality": results["data_quality"],
-            "schema": schema_info,
-        }
 
-    except Exception as e:
-        logger.error(f"Error getting table profile: {str(e)}")
-        raise HTTPException(
-            status_code=500, detail=f"Error getting table profile: {str(e)}"
-        )
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, durations and concurrency
+    per handler; streamed bodies are included in the duration"""
 
+    def __init__(self, app):
+        self.app = app
 
-def _split_table_fqn(table_fqn):
-    """Splits a fully qualified table name into its components."""
-    try:
-        pattern = r"^([^.]+)[\.:]([^.]+)\.([^.]+)"
-        logger.debug(f"Splitting table FQN: {table_fqn}.")
-        match = re.search(pattern, table_fqn)
-        return match.group(1), match.group(2), match.group(3)
-    except Exception as e:
-        logger.error(f"Exception: {e}.")
-        raise e
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
 
+        status = 500
 
-def _construct_bq_resource_string(table_fqn):
-    """Constructs a BigQuery resource string for use in API calls."""
-    try:
-        project_id, dataset_id, table_id = _split_table_fqn(table_fqn)
-        return f"//bigquery.googleapis.com/projects/{project_id}/datasets/{dataset_id}/tables/{table_id}"
-    except Exception as e:
-        logger.error(f"Exception: {e}.")
-        raise e
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
 
+        metrics.gauge_add("data_roster_http_requests_in_flight")
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.gauge_add("data_roster_http_requests_in_flight", value=-1)
+            # The router stores the matched endpoint in the scope
+            endpoint = scope.get("endpoint")
+            handler = endpoint.__name__ if endpoint is not None else "unmatched"
+            metrics.observe(
+                "data_roster_http_request_duration_seconds",
+                (("handler", handler),),
+                time.perf_counter() - started,
+            )
+            metrics.inc(
+                "data_roster_http_requests_total",
+                (
+                    ("handler", handler),
+                    ("method", scope["method"]),
+                    ("status", str(status)),
+                ),
+            )
 
-def _get_table_scan_reference(table_fqn, project_id, location, scan_client):
-    """Retrieves data scan references for a BigQuery table."""
-    try:
-        # logger.info(f"Getting table scan reference for table: {table_fqn}.")
-        data_scans = scan_client.list_data_scans(
-            parent=f"projects/{project_id}/locations/{location}"
-        )
-        bq_resource_string = _construct_bq_resource_string(table_fqn)
-        # logger.info(f"Looking for scans with resource: {bq_resource_string}")
-        scan_references = []
-        for scan in data_scans:
-            if scan.data.resource == bq_resource_string:
-                scan_references.append(scan.name)
-        # logger.info(f"Found scan references: {scan_references}")
-        return scan_references
-    except Exception as e:
-        logger.error(f"Exception: {e}.")
-        raise e
 
+app.add_middleware(MetricsMiddleware)
 
-def _get_table_profile_quality(
-    use_enabled, table_fqn, project_id, location, scan_client
-):
-    """Retrieves both profile and quality information for a BigQuery table."""
-    try:
-        if use_enabled:
-            data_profile_results = []
-            data_quality_results = []
-            table_scan_references = _get_table_scan_reference(
-                table_fqn, project_id, location, scan_client
-            )
 
-            for table_scan_reference in table_scan_references:
-                if table_scan_reference:
-                    scan_jobs = scan_client.list_data_scan_jobs(
-                        ListDataScanJobsRequest(
-                            parent=scan_client.get_data_scan(
-                                GetDataScanRequest(name=table_scan_reference)
-                            ).name
-                        )
-                    )
+class LRUCache:
+    """Thread-safe LRU cache with a maximum size and an optional entry TTL"""
 
-                    for job in scan_jobs:
-                        job_result = scan_client.get_data_scan_job(
-                            request=GetDataScanJobRequest(name=job.name, view="FULL")
-                        )
-                        if job_result.state == DataScanJob.State.SUCCEEDED:
-                            if job_result.data_quality_result:
-                                quality_result = job_result.data_quality_result
-                                # logger.info(
-                                #     f"Processing quality result: {quality_result}"
-                                # )
-                                formatted_quality = {"dimensions": [], "rules": []}
-
-                                # Format dimensions
-                                for dim in quality_result.dimensions:
-                                    formatted_quality["dimensions"].append(
-                                        {
-                                            "dimension": {"name": dim.dimension.name},
-                                            "score": float(dim.score),
-                                            "passed": dim.passed,
-                                        }
-                                    )
-
-                                # Format rules from quality_result.rules
-                                for rule in quality_result.rules:
-                                    rule_info = {
-                                        "column": rule.rule.column,
-                                        "dimension": rule.rule.dimension,
-                                        "passed": rule.passed,
-                                        "passRatio": float(rule.pass_ratio),
-                                        "passedCount": int(rule.passed_count),
-                                        "evaluatedCount": int(rule.evaluated_count),
-                                        "failing_rows_query": rule.failing_rows_query,
-                                        "rule": {
-                                            "non_null_expectation": (
-                                                bool(rule.rule.non_null_expectation)
-                                                if hasattr(
-                                                    rule.rule, "non_null_expectation"
-                                                )
-                                                else None
-                                            ),
-                                            "uniqueness_expectation": (
-                                                bool(rule.rule.uniqueness_expectation)
-                                                if hasattr(
-                                                    rule.rule, "uniqueness_expectation"
-                                                )
-                                                else None
-                                            ),
-                                            "set_expectation": (
-                                                {
-                                                    "values": list(
-                                                        rule.rule.set_expectation.values
-                                                    ),
-                                                }
-                                                if hasattr(rule.rule, "set_expectation")
-                                                else None
-                                            ),
-                                            "row_condition_expectation": (
-                                                {
-                                                    "sql_expression": rule.rule.row_condition_expectation.sql_expression
-                                                }
-                                                if hasattr(
-                                                    rule.rule,
-                                                    "row_condition_expectation",
-                                                )
-                                                else None
-                                            ),
-                                        },
-                                    }
-                                    formatted_quality["rules"].append(rule_info)
-
-                                data_quality_results.append(formatted_quality)
-
-                            if job_result.data_profile_result:
-                                profile = job_result.data_profile_result
-                                # logger.info(f"Processing profile result: {profile}")
-
-                                formatted_profile = {
-                                    "rowCount": int(profile.row_count),
-                                    "fields": [],
-                                }
-
-                                # Process each field in the profile
-                                if hasattr(profile, "profile") and hasattr(
-                                    profile.profile, "fields"
-                                ):
-                                    for field in profile.profile.fields:
-                                        field_info = {
-                                            "name": field.name,
-                                            "type": field.type_,
-                                            "mode": field.mode,
-                                            "nullCount": 0,
-                                            "distinctCount": 0,
-                                            "topNValues": [],
-                                            "profile": {
-                                                "minLength": 0,
-                                                "maxLength": 0,
-                                                "avgLength": 0.0,
-                                            },
-                                        }
-
-                                        if hasattr(field, "profile"):
-                                            profile_info = field.profile
-                                            # Add distinct ratio
-                                            field_info["distinctRatio"] = (
-                                                profile_info.distinct_ratio
-                                            )
-
-                                            # Add top N values with their counts and ratios
-                                            if hasattr(profile_info, "top_n_values"):
-                                                for value in profile_info.top_n_values:
-                                                    field_info["topNValues"].append(
-                                                        {
-                                                            "value": str(value.value),
-                                                            "count": int(value.count),
-                                                            "ratio": float(value.ratio),
-                                                        }
-                                                    )
-
-                                            # Add string profile if available
-                                            if hasattr(profile_info, "string_profile"):
-                                                field_info["profile"].update(
-                                                    {
-                                                        "minLength": int(
-                                                            profile_info.string_profile.min_length
-                                                        ),
-                                                        "maxLength": int(
-                                                            profile_info.string_profile.max_length
-                                                        ),
-                                                        "avgLength": float(
-                                                            profile_info.string_profile.average_length
-                                                        ),
-                                                    }
-                                                )
-
-                                            # Calculate null and distinct counts
-                                            total_rows = profile.row_count
-                                            field_info["nullCount"] = (
-                                                int(
-                                                    total_rows
-                                                    * (1 - profile_info.non_null_ratio)
-                                                )
-                                                if hasattr(
-                                                    profile_info, "non_null_ratio"
-                                                )
-                                                else 0
-                                            )
-                                            field_info["distinctCount"] = (
-                                                int(
-                                                    total_rows
-                                                    * profile_info.distinct_ratio
-                                                )
-                                                if hasattr(
-                                                    profile_info, "distinct_ratio"
-                                                )
-                                                else 0
-                                            )
-
-                                        formatted_profile["fields"].append(field_info)
-
-                                data_profile_results.append(formatted_profile)
+    def __init__(self, max_entries: int, ttl_seconds: float = None):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
 
-            # logger.info(f"Final profile results: {data_profile_results}")
-            # logger.info(f"Final quality results: {data_quality_results}")
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            value, stored_at = cached
+            if (
+                self._ttl_seconds is not None
+                and time.monotonic() - stored_at > self._ttl_seconds
+            ):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
 
-            return {
-                "data_profile": data_profile_results,
-                "data_quality": data_quality_results,
-            }
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls sharing a key into a single execution.
+
+    The first caller of a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result or exception.
+    Calls, executions and coalesced waiters are counted per kind of key
+    (its first element).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._stats = defaultdict(
+            lambda: {"calls": 0, "executions": 0, "coalesced": 0}
+        )
+        self._lock = threading.Lock()
+
+    def do(self, key: tuple, func, *args, **kwargs):
+        with self._lock:
+            stats = self._stats[key[0]]
+            stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                stats["executions"] += 1
+            else:
+                stats["coalesced"] += 1
+
+        if leader:
+            try:
+                call["result"] = func(*args, **kwargs)
+            except Exception as e:
+                call["error"] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call["done"].set()
         else:
-            return {
-                "data_profile": [],
-                "data_quality": [],
-            }
-    except Exception as e:
-        logger.error(f"Exception: {e}")
-        raise e
+            call["done"].wait()
 
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"]
 
-@app.get("/api/data-products/{table_id}/lineage")
-async def get_table_lineage(table_id: str, project_id: str, location: str):
-    """Get lineage information for a BigQuery table"""
-    try:
-        catalog_client = dataplex_v1.CatalogServiceClient()
-        try:
-            # List all entries and find our table
-            parent = f"projects/{project_id}/locations/{location}/entryGroups/@bigquery"
-            request = dataplex_v1.ListEntriesRequest(parent=parent)
-            entries = catalog_client.list_entries(request=request)
-            table_entry = None
+    def stats(self) -> Dict:
+        """Return the counters and the number of in-flight calls per kind"""
+        with self._lock:
+            stats = {kind: dict(counters) for kind, counters in self._stats.items()}
+            for key in self._calls:
+                stats[key[0]]["in_flight"] = stats[key[0]].get("in_flight", 0) + 1
+        for counters in stats.values():
+            counters.setdefault("in_flight", 0)
+        return stats
 
-            # Find the specific table entry
-            for entry in entries:
-                if table_id in entry.name:
-                    table_entry = entry
-                    break
 
-            if not table_entry:
-                logger.warning(f"No matching entry found for table_id: {table_id}")
-                return {"sources": [], "processes": []}
+single_flight = SingleFlight()
+
+
+def _age_to_monotonic(age_seconds: float) -> float:
+    """Return the time.monotonic() value of an event `age_seconds` ago"""
+    return time.monotonic() - max(0.0, age_seconds)
+
 
-            # Get the table's fully qualified name for lineage lookup
-            table_fqn = (
-                table_entry.entry_source.resource.replace(
-                    "//bigquery.googleapis.com/projects/", ""
+class CatalogStore:
+    """Embedded on-disk store backed by a SQLite file in WAL mode.
+
+    Payloads are JSON documents namespaced by kind, project_id and location,
+    plus an optional key within that namespace, and carry the wall-clock time
+    they were stored at so their age survives restarts. The file records a
+    schema version; a file written by another version is emptied on open.
+    """
+
+    # 2: formatted profile results carry nullRatio
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS store_meta "
+            "(name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        row = self._db.execute(
+            "SELECT value FROM store_meta WHERE name = 'schema_version'"
+        ).fetchone()
+        if row is None or int(row[0]) != self.SCHEMA_VERSION:
+            if row is not None:
+                logger.warning(
+                    f"Catalog store {path} has schema version {row[0]}, "
+                    f"resetting it to version {self.SCHEMA_VERSION}"
                 )
-                .replace("/datasets/", ".")
-                .replace("/tables/", ".")
+            self._db.execute("DROP TABLE IF EXISTS store_entries")
+            # Left behind by the scan job cache before the store existed
+            self._db.execute("DROP TABLE IF EXISTS scan_job_results")
+            self._db.execute(
+                "INSERT OR REPLACE INTO store_meta (name, value) "
+                "VALUES ('schema_version', ?)",
+                (str(self.SCHEMA_VERSION),),
             )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS store_entries ("
+            "kind TEXT NOT NULL, project_id TEXT NOT NULL, "
+            "location TEXT NOT NULL, key TEXT NOT NULL, "
+            "payload TEXT NOT NULL, stored_at REAL NOT NULL, "
+            "PRIMARY KEY (kind, project_id, location, key))"
+        )
+        self._db.commit()
 
-            try:
-                lineage_client = datacatalog_lineage_v1.LineageClient()
+    def load(self, kind: str, project_id: str, location: str, key: str = ""):
+        """Return (payload, age in seconds) of a stored document, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, stored_at FROM store_entries "
+                "WHERE kind = ? AND project_id = ? AND location = ? AND key = ?",
+                (kind, project_id, location, key),
+            ).fetchone()
+        if row is None:
+            return None
+        return orjson.loads(row[0]), time.time() - row[1]
 
-                target = datacatalog_lineage_v1.EntityReference()
-                target.fully_qualified_name = f"bigquery:{table_fqn}"
+    def save(self, kind: str, project_id: str, location: str, payload, key: str = ""):
+        document = _dumps(payload).decode()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO store_entries "
+                "(kind, project_id, location, key, payload, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, project_id, location, key, document, time.time()),
+            )
+            self._db.commit()
+        return len(document)
 
-                request = datacatalog_lineage_v1.SearchLinksRequest(
-                    parent=f"projects/{project_id}/locations/{location}",
-                    target=target,
-                )
+    def namespaces(self, kind: str) -> List[tuple]:
+        """Return the (project_id, location) pairs holding documents of a kind"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT DISTINCT project_id, location FROM store_entries "
+                "WHERE kind = ?",
+                (kind,),
+            ).fetchall()
 
-                link_results = lineage_client.search_links(request=request)
-                sources = []
-                processes = []
+    def delete(
+        self, kinds: List[str], project_id: str = None, location: str = None
+    ) -> int:
+        """Delete the documents of the given kinds matching project/location"""
+        query = "DELETE FROM store_entries WHERE kind IN ({})".format(
+            ", ".join("?" for _ in kinds)
+        )
+        params = list(kinds)
+        if project_id is not None:
+            query += " AND project_id = ?"
+            params.append(project_id)
+        if location is not None:
+            query += " AND location = ?"
+            params.append(location)
+        with self._lock:
+            deleted = self._db.execute(query, params).rowcount
+            self._db.commit()
+        return deleted
 
-                for link in link_results:
-                    if link.target.fully_qualified_name == target.fully_qualified_name:
-                        source_table = link.source.fully_qualified_name.replace(
-                            "bigquery:", ""
-                        )
-                        sources.append(source_table)
-
-                        # Get process information
-                        process_request = (
-                            datacatalog_lineage_v1.BatchSearchLinkProcessesRequest(
-                                parent=f"projects/{project_id}/locations/{location}",
-                                links=[link.name],
-                            )
-                        )
-                        process_results = lineage_client.batch_search_link_processes(
-                            request=process_request
-                        )
+    def close(self):
+        with self._lock:
+            self._db.close()
 
-                        for process in process_results:
-                            process_details = lineage_client.get_process(
-                                request=datacatalog_lineage_v1.GetProcessRequest(
-                                    name=process.process
-                                )
-                            )
-
-                            # Create process info with safer field access
-                            process_info = {
-                                "id": process_details.attributes.get(
-                                    "bigquery_job_id", "unknown"
-                                ),
-                                "sql": process_details.display_name,
-                            }
 
-                            # Only add timestamps if they exist in the attributes
-                            if "start_time" in process_details.attributes:
-                                process_info["start_time"] = process_details.attributes[
-                                    "start_time"
-                                ]
-                            if "end_time" in process_details.attributes:
-                                process_info["end_time"] = process_details.attributes[
-                                    "end_time"
-                                ]
+catalog_store = CatalogStore(CATALOG_STORE_PATH) if CATALOG_STORE_PATH else None
 
-                            processes.append(process_info)
 
-                return {"sources": sources, "processes": processes}
+class ClientRegistry:
+    """Long-lived Google API clients shared by every request.
 
-            except Exception as e:
-                logger.error(f"Error getting lineage details: {str(e)}")
-                return {"sources": [], "processes": []}
+    Credentials are discovered once and clients are created lazily on first
+    use, so gRPC channels and HTTP sessions are reused across requests. A
+    background thread refreshes the credentials before they expire, and
+    close() releases every client on application shutdown.
+    """
 
-        except google_exceptions.NotFound as e:
-            logger.warning(f"Entry not found: {str(e)}")
-            return {"sources": [], "processes": []}
+    def __init__(self, credentials_refresh_seconds: float):
+        self._credentials_refresh_seconds = credentials_refresh_seconds
+        self._credentials = None
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._create_locks = defaultdict(threading.Lock)
+        self._stop_event = threading.Event()
+        self._refresher = None
 
-    except Exception as e:
-        logger.error(f"Error getting table lineage: {str(e)}")
-        raise HTTPException(
-            status_code=500, detail=f"Error getting table lineage: {str(e)}"
+    def credentials(self):
+        with self._lock:
+            if self._credentials is None:
+                self._credentials, _ = default()
+            return self._credentials
+
+    def catalog(self) -> dataplex_v1.CatalogServiceClient:
+        return self._get(
+            "catalog",
+            lambda: _instrument(
+                dataplex_v1.CatalogServiceClient(credentials=self.credentials()),
+                "catalog",
+            ),
+        )
+
+    def data_scans(self) -> dataplex_v1.DataScanServiceClient:
+        return self._get(
+            "data_scans",
+            lambda: _instrument(
+                dataplex_v1.DataScanServiceClient(credentials=self.credentials()),
+                "data_scans",
+            ),
+        )
+
+    def lineage(self) -> datacatalog_lineage_v1.LineageClient:
+        return self._get(
+            "lineage",
+            lambda: _instrument(
+                datacatalog_lineage_v1.LineageClient(credentials=self.credentials()),
+                "lineage",
+            ),
+        )
+
+    def bigquery(self, project_id: str) -> bigquery.Client:
+        return self._get(
+            ("bigquery", project_id),
+            lambda: _instrument(
+                bigquery.Client(project=project_id, credentials=self.credentials()),
+                "bigquery",
+            ),
+        )
+
+    def start(self):
+        """Start the background credentials refresher"""
+        if self._credentials_refresh_seconds <= 0 or self._refresher is not None:
+            return
+        self._stop_event.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="credentials-refresher", daemon=True
+        )
+        self._refresher.start()
+
+    def close(self):
+        """Stop the refresher and close every client"""
+        self._stop_event.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            try:
+                if hasattr(client, "transport"):
+                    client.transport.close()
+                else:
+                    client.close()
+            except Exception as e:
+                logger.warning(f"Error closing client: {str(e)}")
+
+    def _get(self, key, factory):
+        with self._lock:
+            client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            create_lock = self._create_locks[key]
+        # Concurrent first calls create a single client: a discarded one
+        # would leak its gRPC channel or HTTP session
+        with create_lock:
+            with self._lock:
+                client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                with self._lock:
+                    self._clients[key] = client
+            return client
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self._credentials_refresh_seconds):
+            with self._lock:
+                credentials = self._credentials
+            if credentials is None:
+                continue
+
+            expiry = getattr(credentials, "expiry", None)
+            expires_soon = expiry is not None and expiry - datetime.utcnow() < (
+                timedelta(seconds=2 * self._credentials_refresh_seconds)
+            )
+            if credentials.valid and not expires_soon:
+                continue
+            try:
+                credentials.refresh(google_auth_requests.Request())
+            except Exception as e:
+                logger.warning(f"Error refreshing credentials: {str(e)}")
+
+
+clients = ClientRegistry(credentials_refresh_seconds=CREDENTIALS_REFRESH_SECONDS)
+
+# The Google SDK calls are synchronous; handlers run them on this pool so a
+# slow upstream call never blocks the event loop for other requests
+io_executor = ThreadPoolExecutor(
+    max_workers=IO_THREAD_POOL_SIZE, thread_name_prefix="io"
+)
+
+# Process-wide pools for the fan-out inside requests, shared by all requests
+# so their thread count stays bounded: the components of a data product, and
+# the scan job and lineage RPCs of a table. Work running on one pool only
+# ever waits on the next pool down, never on its own, so they cannot deadlock.
+component_executor = ThreadPoolExecutor(
+    max_workers=max(1, PRODUCT_DETAILS_CONCURRENCY), thread_name_prefix="component"
+)
+scan_job_executor = ThreadPoolExecutor(
+    max_workers=max(1, SCAN_JOB_FETCH_CONCURRENCY), thread_name_prefix="scan-job"
+)
+lineage_executor = ThreadPoolExecutor(
+    max_workers=max(1, LINEAGE_FETCH_CONCURRENCY), thread_name_prefix="lineage"
+)
+
+_TIMEOUT_DETAIL = "Timed out waiting for Google Cloud APIs"
+
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the I/O pool, bounded by REQUEST_TIMEOUT_SECONDS.
+
+    The call runs in a copy of the caller's context, so trace spans opened by
+    the handler remain the parents of the spans of the call.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await asyncio.wait_for(
+        loop.run_in_executor(
+            io_executor, functools.partial(context.run, func, *args, **kwargs)
+        ),
+        timeout=REQUEST_TIMEOUT_SECONDS,
+    )
+
+
+def is_bigquery_entry(entry: dataplex_v1.Entry) -> bool:
+    """Check if the entry is from BigQuery"""
+    return (
+        hasattr(entry, "entry_source")
+        and hasattr(entry.entry_source, "system")
+        and entry.entry_source.system.upper() == "BIGQUERY"
+    )
+
+
+def get_data_product_name(entry: dataplex_v1.Entry) -> str:
+    """Extract data product name from entry labels"""
+    if (
+        hasattr(entry, "entry_source")
+        and hasattr(entry.entry_source, "labels")
+        and "dataproduct-name" in entry.entry_source.labels
+    ):
+        return entry.entry_source.labels["dataproduct-name"]
+    return None
+
+
+def _intern_labels(labels) -> Dict[str, str]:
+    """Copy a labels map into a plain dict of interned strings, so label keys
+    and values repeated across entries are stored once"""
+    return {sys.intern(key): sys.intern(value) for key, value in labels.items()}
+
+
+class Component(NamedTuple):
+    """A data product component: one BigQuery catalog entry.
+
+    The entry source labels are kept once; to_dict() expands the component
+    into the JSON shape of the API, where they appear both under "source" and
+    at the top level.
+    """
+
+    id: str
+    name: str
+    type: str
+    created_at: str
+    system: str
+    resource: str
+    labels: Dict[str, str]
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "type": self.type,
+            "created_at": self.created_at,
+            "source": {
+                "system": self.system,
+                "resource": self.resource,
+                "labels": self.labels,
+            },
+            "labels": self.labels,
+        }
+
+    @classmethod
+    def from_dict(cls, component: Dict) -> "Component":
+        return cls(
+            id=component["id"],
+            name=component["name"],
+            type=component["type"],
+            created_at=component["created_at"],
+            system=component["source"]["system"],
+            resource=component["source"]["resource"],
+            labels=_intern_labels(component["labels"]),
+        )
+
+
+class DataProduct(NamedTuple):
+    """A data product and its components; its id is its name"""
+
+    name: str
+    kind: str
+    team: str
+    tags: List[str]
+    created_at: str
+    components: List[Component]
+
+    @property
+    def id(self) -> str:
+        return self.name
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "kind": self.kind,
+            "team": self.team,
+            "components": [component.to_dict() for component in self.components],
+            "tags": self.tags,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data_product: Dict) -> "DataProduct":
+        return cls(
+            name=data_product["name"],
+            kind=data_product["kind"],
+            team=data_product["team"],
+            tags=data_product["tags"],
+            created_at=data_product["created_at"],
+            components=[
+                Component.from_dict(component)
+                for component in data_product["components"]
+            ],
+        )
+
+
+def transform_dataplex_entry(entry: dataplex_v1.Entry) -> Component:
+    """Transform a Dataplex entry into a Component"""
+    entry_source = entry.entry_source if hasattr(entry, "entry_source") else None
+    entry_id = entry.name.split("/")[-1]
+
+    return Component(
+        id=entry_id,
+        name=(
+            entry_source.display_name
+            if entry_source and hasattr(entry_source, "display_name")
+            else entry_id
+        ),
+        type=sys.intern(
+            entry.entry_type.split("/")[-1]
+            if entry and hasattr(entry, "entry_type")
+            else "Unknown"
+        ),
+        created_at=(
+            entry_source.create_time.isoformat()
+            if entry_source and hasattr(entry_source, "create_time")
+            else datetime.now().isoformat()
+        ),
+        system=sys.intern(
+            entry_source.system
+            if entry_source and hasattr(entry_source, "system")
+            else "Unknown"
+        ),
+        resource=(
+            entry_source.resource
+            if entry_source and hasattr(entry_source, "resource")
+            else ""
+        ),
+        labels=(
+            _intern_labels(entry_source.labels)
+            if entry_source and hasattr(entry_source, "labels")
+            else {}
+        ),
+    )
+
+
+def transform_data_product(name: str, components: List[Component]) -> DataProduct:
+    """Transform a collection of components into a data product.
+
+    Kind and team come from the first component carrying the
+    dataproduct-kind and dataproduct-team labels (defaulting to
+    source-aligned and Unassigned); tags are the other distinct label values.
+    Everything is derived in a single pass over the components.
+    """
+    kind = None
+    team = None
+    label_values = set()
+    created_at = None
+    for component in components:
+        labels = component.labels
+        if kind is None and "dataproduct-kind" in labels:
+            kind = labels["dataproduct-kind"]
+        if team is None and "dataproduct-team" in labels:
+            team = labels["dataproduct-team"]
+        label_values.update(labels.values())
+        if created_at is None or component.created_at < created_at:
+            created_at = component.created_at
+
+    if kind is None:
+        kind = "source-aligned"
+    if team is None:
+        team = "Unassigned"
+    # Also exclude the name, kind and team from tags
+    label_values.difference_update((name, kind, team))
+
+    return DataProduct(
+        name=name,
+        kind=kind,
+        team=team,
+        tags=list(label_values),
+        created_at=created_at or datetime.now().isoformat(),
+        components=components,
+    )
+
+
+class CatalogComponent(NamedTuple):
+    """A data product component read from the catalog, with the entry
+    metadata needed to keep a synced view of the catalog up to date"""
+
+    data_product: str
+    component: Component
+    entry_name: str
+    update_time: Optional[datetime]
+
+
+def _entry_update_time(entry: dataplex_v1.Entry) -> Optional[datetime]:
+    """Return the latest of the entry and entry source update times"""
+    update_times = [
+        update_time
+        for update_time in (
+            entry.update_time,
+            entry.entry_source.update_time if entry.entry_source else None,
+        )
+        if update_time
+    ]
+    return max(update_times, default=None)
+
+
+def _to_data_product_component(entry: dataplex_v1.Entry, data_product: str = None):
+    """Return the CatalogComponent of an entry, or None if the entry is not a
+    BigQuery data product component"""
+    try:
+        # Only process BigQuery entries that belong
+        # to a data product
+        if not is_bigquery_entry(entry):
+            logger.debug("Skipping non-BigQuery entry: " f"{entry.name}")
+            return None
+
+        data_product_name = get_data_product_name(entry)
+        if not data_product_name:
+            logger.debug(
+                "Skipping entry without data " f"product label: {entry.name}"
+            )
+            return None
+        if data_product and data_product_name != data_product:
+            return None
+
+        return CatalogComponent(
+            data_product_name,
+            transform_dataplex_entry(entry),
+            entry.name,
+            _entry_update_time(entry),
+        )
+    except Exception as transform_error:
+        logger.error(
+            "Error transforming entry " f"{entry.name}: {str(transform_error)}"
+        )
+        return None
+
+
+def _crawl_entry_group(
+    client, entry_group_name: str, data_product: str = None
+) -> List[tuple]:
+    """List one entry group and return its CatalogComponents"""
+
+    # List entries in this entry group
+    @retry.Retry(
+        predicate=retry.if_exception_type(google_exceptions.ServiceUnavailable)
+    )
+    def list_entries():
+        request = dataplex_v1.ListEntriesRequest(
+            parent=entry_group_name,
+            page_size=100,
+        )
+        return client.list_entries(request=request, timeout=RPC_TIMEOUT_SECONDS)
+
+    components = []
+    try:
+        # Get entries for this group
+        entries_iterator = list_entries()
+
+        for entry in entries_iterator:
+            component = _to_data_product_component(entry, data_product)
+            if component:
+                components.append(component)
+
+    except google_exceptions.PermissionDenied as e:
+        logger.warning(
+            "Permission denied for entry group " f"{entry_group_name}: {str(e)}"
+        )
+    except Exception as e:
+        logger.error("Error processing entry group " f"{entry_group_name}: {str(e)}")
+
+    return components
+
+
+def _build_data_product_search_query(location: str, data_product: str = None) -> str:
+    """Build a catalog search query selecting BigQuery data product entries"""
+    query = f"system=BIGQUERY location={location} label:dataproduct-name"
+    if data_product:
+        query += f" label=dataproduct-name:{data_product}"
+    return query
+
+
+def _search_data_product_pages(
+    client, project_id: str, location: str, data_product: str = None
+):
+    """Find data product components with a single catalog search.
+
+    The BigQuery system, the dataproduct-name label and the optional product
+    name are evaluated server side, so only data product entries are paged
+    back. Results are still checked locally with the same predicates as the
+    full scan. Yields the CatalogComponents of each page.
+    """
+
+    @retry.Retry(
+        predicate=retry.if_exception_type(google_exceptions.ServiceUnavailable)
+    )
+    def search_entries():
+        request = dataplex_v1.SearchEntriesRequest(
+            name=f"projects/{project_id}/locations/global",
+            scope=f"projects/{project_id}",
+            query=_build_data_product_search_query(location, data_product),
+            page_size=1000,
+        )
+        return client.search_entries(request=request, timeout=RPC_TIMEOUT_SECONDS)
+
+    for page in search_entries().pages:
+        components = []
+        for result in page.results:
+            component = _to_data_product_component(
+                result.dataplex_entry, data_product
+            )
+            if component:
+                components.append(component)
+        yield components
+
+
+def _iter_data_product_batches(
+    project_id: str,
+    location: str,
+    mode: str = None,
+    data_product: str = None,
+):
+    """Read the data product components of a location in batches.
+
+    Yields (batch index, [CatalogComponent, ...]) as soon as each batch is
+    read: one batch per search results page, or one per entry
+    group. Entry groups are crawled concurrently and yielded in completion
+    order; the batch index is their position in the entry group listing.
+
+    mode selects how entries are read from the catalog:
+      - "search": one catalog search with the data product predicates pushed
+        down to the server, falling back to "full" if the search fails
+      - "bigquery": list only the @bigquery entry group
+      - "full": list every entry group in the location
+    """
+    mode = mode or CATALOG_CRAWL_MODE
+
+    client = clients.catalog()
+
+    parent_location = f"projects/{project_id}/locations/{location}"
+
+    if mode == "search":
+        pages = _search_data_product_pages(client, project_id, location, data_product)
+        try:
+            # The first page decides whether the search is usable at all
+            first_page = next(pages, None)
+        except google_exceptions.GoogleAPICallError as e:
+            logger.warning(
+                f"Catalog search failed, falling back to a full scan: {str(e)}"
+            )
+            mode = "full"
+        else:
+            if first_page is not None:
+                yield 0, first_page
+                for index, page in enumerate(pages, start=1):
+                    yield index, page
+            return
+
+    if mode == "bigquery":
+        entry_group_names = [f"{parent_location}/entryGroups/@bigquery"]
+    else:
+        # First, list all entry groups in the location
+        entry_groups_request = dataplex_v1.ListEntryGroupsRequest(
+            parent=parent_location
+        )
+        entry_group_names = [
+            entry_group.name
+            for entry_group in client.list_entry_groups(
+                request=entry_groups_request, timeout=RPC_TIMEOUT_SECONDS
+            )
+        ]
+
+    # Crawl entry groups in parallel
+    max_workers = max(1, min(CATALOG_CRAWL_CONCURRENCY, len(entry_group_names)))
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="entry-group-crawl"
+    )
+    try:
+        futures = {
+            executor.submit(_crawl_entry_group, client, name, data_product): index
+            for index, name in enumerate(entry_group_names)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _group_data_products(batches) -> List[DataProduct]:
+    """Group batches of CatalogComponents into data products"""
+    # Group entries by data product name
+    data_product_components = defaultdict(list)
+    for batch in batches:
+        for item in batch:
+            data_product_components[item.data_product].append(item.component)
+
+    # Transform components into data products
+    return [
+        transform_data_product(name, components)
+        for name, components in data_product_components.items()
+    ]
+
+
+def _crawl_data_products(
+    project_id: str,
+    location: str,
+    mode: str = None,
+    data_product: str = None,
+) -> List[DataProduct]:
+    """Build the data products of a location"""
+    # Results are merged in batch order so the output does not depend on
+    # which entry group finishes first
+    batches = sorted(
+        _iter_data_product_batches(project_id, location, mode, data_product),
+        key=lambda batch: batch[0],
+    )
+    return _group_data_products(components for _, components in batches)
+
+
+def _search_updated_components(
+    client, project_id: str, location: str, since: datetime
+) -> List[CatalogComponent]:
+    """Return the data product components updated at or after `since`.
+
+    The catalog search is ordered by last modification, newest first, so
+    paging stops at the first entry older than `since`.
+    """
+
+    @retry.Retry(
+        predicate=retry.if_exception_type(google_exceptions.ServiceUnavailable)
+    )
+    def search_entries():
+        request = dataplex_v1.SearchEntriesRequest(
+            name=f"projects/{project_id}/locations/global",
+            scope=f"projects/{project_id}",
+            query=_build_data_product_search_query(location),
+            order_by="last_modified_timestamp",
+            page_size=1000,
+        )
+        return client.search_entries(request=request, timeout=RPC_TIMEOUT_SECONDS)
+
+    components = []
+    for result in search_entries():
+        entry = result.dataplex_entry
+        update_time = _entry_update_time(entry)
+        if update_time is not None and update_time < since:
+            break
+        component = _to_data_product_component(entry)
+        if component:
+            components.append(component)
+    return components
+
+
+class CatalogCrawlFeed:
+    """Fans the batches of in-flight full catalog crawls out to streaming
+    responses.
+
+    A crawl of a (project_id, location) publishes each batch as soon as it is
+    read and then finishes, with or without an error. Subscribers receive
+    ("batch", crawl, batch) and ("end", crawl, error) events on an
+    asyncio.Queue of their event loop; subscribing while a crawl is in flight
+    first replays the batches it has read so far.
+    """
+
+    def __init__(self):
+        self._crawls = {}
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, project_id: str, location: str) -> asyncio.Queue:
+        """Subscribe the running event loop to the crawls of a key"""
+        key = (project_id, location)
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        with self._lock:
+            crawl = self._crawls.get(key)
+            if crawl is not None:
+                for batch in crawl["batches"]:
+                    queue.put_nowait(("batch", crawl, batch))
+            self._subscribers[key].append((loop, queue))
+        return queue
+
+    def unsubscribe(self, project_id: str, location: str, queue: asyncio.Queue):
+        key = (project_id, location)
+        with self._lock:
+            subscribers = [
+                subscriber
+                for subscriber in self._subscribers.get(key, [])
+                if subscriber[1] is not queue
+            ]
+            if subscribers:
+                self._subscribers[key] = subscribers
+            else:
+                self._subscribers.pop(key, None)
+
+    def start(self, project_id: str, location: str) -> Dict:
+        """Start a crawl of a key; its batches are kept in crawl["batches"]"""
+        crawl = {"batches": []}
+        with self._lock:
+            self._crawls[(project_id, location)] = crawl
+        return crawl
+
+    def publish(self, project_id: str, location: str, crawl: Dict, batch):
+        with self._lock:
+            crawl["batches"].append(batch)
+            self._notify((project_id, location), ("batch", crawl, batch))
+
+    def finish(
+        self, project_id: str, location: str, crawl: Dict, error: Exception = None
+    ):
+        key = (project_id, location)
+        with self._lock:
+            if self._crawls.get(key) is crawl:
+                del self._crawls[key]
+            self._notify(key, ("end", crawl, error))
+
+    def _notify(self, key, event):
+        for loop, queue in self._subscribers.get(key, []):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's event loop is closed
+                pass
+
+
+catalog_crawl_feed = CatalogCrawlFeed()
+
+
+class CatalogSyncEngine:
+    """Materialized view of the data product components of each
+    (project_id, location), kept up to date incrementally.
+
+    The first sync of a key crawls the whole catalog. In "search" mode later
+    syncs only read the entries modified since the last sync watermark
+    (minus a safety overlap) and upsert them into the view. Search results do
+    not report deleted entries, so a full crawl, which replaces the view and
+    therefore drops deleted or unlabelled entries, still runs every
+    CATALOG_FULL_SYNC_SECONDS. The other crawl modes cannot filter on update
+    time server side, so every sync of theirs is a full crawl.
+    Full crawls publish their batches to `feed` as they are read.
+    """
+
+    def __init__(
+        self,
+        full_sync_seconds: float,
+        overlap_seconds: float,
+        feed: CatalogCrawlFeed = None,
+    ):
+        self._full_sync_seconds = full_sync_seconds
+        self._overlap = timedelta(seconds=overlap_seconds)
+        self._feed = feed or CatalogCrawlFeed()
+        self._views = {}
+        self._lock = threading.Lock()
+        self._sync_locks = defaultdict(threading.Lock)
+
+    def sync(self, project_id: str, location: str) -> List[DataProduct]:
+        """Bring the view of a key up to date and return its data products"""
+        key = (project_id, location)
+        with self._sync_locks[key]:
+            with self._lock:
+                view = self._views.get(key)
+
+            if (
+                view is None
+                or CATALOG_CRAWL_MODE != "search"
+                or time.monotonic() - view["full_synced_at"] > self._full_sync_seconds
+            ):
+                with metrics.phase("catalog.full_sync"):
+                    view = self._full_sync(project_id, location)
+            else:
+                with metrics.phase("catalog.incremental_sync"):
+                    view = self._incremental_sync(project_id, location, view)
+
+            with self._lock:
+                self._views[key] = view
+            return _group_data_products([view["components"].values()])
+
+    def invalidate(self, project_id: str = None, location: str = None) -> int:
+        with self._lock:
+            keys = [
+                key
+                for key in self._views
+                if (project_id is None or key[0] == project_id)
+                and (location is None or key[1] == location)
+            ]
+            for key in keys:
+                del self._views[key]
+        return len(keys)
+
+    def _full_sync(self, project_id: str, location: str):
+        crawl = self._feed.start(project_id, location)
+        try:
+            for batch in _iter_data_product_batches(project_id, location):
+                self._feed.publish(project_id, location, crawl, batch)
+        except Exception as e:
+            self._feed.finish(project_id, location, crawl, e)
+            raise
+        self._feed.finish(project_id, location, crawl)
+        batches = sorted(crawl["batches"], key=lambda batch: batch[0])
+        return self._new_view(
+            component for _, batch in batches for component in batch
+        )
+
+    def _incremental_sync(self, project_id: str, location: str, view):
+        if view["watermark"] is None:
+            return self._full_sync(project_id, location)
+
+        try:
+            updated = _search_updated_components(
+                clients.catalog(),
+                project_id,
+                location,
+                since=view["watermark"] - self._overlap,
+            )
+        except google_exceptions.GoogleAPICallError as e:
+            logger.warning(
+                f"Incremental catalog sync failed, running a full sync: {str(e)}"
+            )
+            return self._full_sync(project_id, location)
+
+        components = dict(view["components"])
+        for component in updated:
+            components[component.entry_name] = component
+        return {
+            "components": components,
+            "watermark": self._watermark(components.values()),
+            "full_synced_at": view["full_synced_at"],
+        }
+
+    def _new_view(self, components):
+        components = {component.entry_name: component for component in components}
+        return {
+            "components": components,
+            "watermark": self._watermark(components.values()),
+            "full_synced_at": time.monotonic(),
+        }
+
+    @staticmethod
+    def _watermark(components):
+        return max(
+            (c.update_time for c in components if c.update_time is not None),
+            default=None,
+        )
+
+
+catalog_sync = CatalogSyncEngine(
+    full_sync_seconds=CATALOG_FULL_SYNC_SECONDS,
+    overlap_seconds=CATALOG_SYNC_OVERLAP_SECONDS,
+    feed=catalog_crawl_feed,
+)
+
+
+# Weight of a query token found in each indexed field; a token matching only
+# the prefix of an indexed term scores half of it
+_SEARCH_FIELD_WEIGHTS = {
+    "name": 8.0,
+    "team": 4.0,
+    "kind": 3.0,
+    "tag": 3.0,
+    "component": 2.0,
+    "column": 1.5,
+    "resource": 1.0,
+}
+_SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _search_tokens(text: str) -> List[str]:
+    return _SEARCH_TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """Inverted index over the data products of each (project_id, location).
+
+    Product names, teams, kinds and tags, component names and resources, and
+    the column names of the tables whose schema has been fetched are split
+    into lowercase tokens. Each token maps to the products containing it and
+    the weight of the best field it was found in; a sorted token list answers
+    prefix queries.
+
+    Updates run on a single background thread: when a new catalog snapshot
+    is stored only the data products that differ from the indexed ones are
+    re-indexed, and searches keep using the previous index meanwhile.
+    """
+
+    def __init__(self):
+        self._namespaces = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="search-index"
+        )
+
+    def schedule_sync(self, project_id: str, location: str, snapshot):
+        """Index a snapshot in the background, replacing any pending one"""
+        key = (project_id, location)
+        with self._lock:
+            scheduled = key in self._pending
+            self._pending[key] = snapshot
+        if not scheduled:
+            self._executor.submit(self._sync_pending, key)
+
+    def ensure(self, project_id: str, location: str, snapshot):
+        """Wait until a key is indexed, indexing `snapshot` if it never was"""
+        with self._lock:
+            namespace = self._namespaces.get((project_id, location))
+            if namespace is not None and namespace["snapshot"] is not None:
+                return
+        self._executor.submit(self._sync, (project_id, location), snapshot).result()
+
+    def add_columns(self, project_id: str, location: str, table_fqn: str, columns):
+        """Index the column names of a table for the products containing it"""
+        self._executor.submit(
+            self._add_columns, (project_id, location), table_fqn, tuple(columns)
+        )
+
+    def invalidate(self, project_id: str = None, location: str = None):
+        self._executor.submit(self._invalidate, project_id, location)
+
+    def search(
+        self, project_id: str, location: str, query: str, offset: int, limit: int
+    ) -> Dict:
+        """Rank the data products matching every token of a query.
+
+        A token matches an indexed term equal to it or starting with it; a
+        product scores, per token, the best weight among its matching terms.
+        """
+        tokens = list(dict.fromkeys(_search_tokens(query)))
+        with self._lock:
+            namespace = self._namespaces.get((project_id, location))
+            if namespace is None or not tokens:
+                return {"total": 0, "results": []}
+
+            scores = None
+            for token in tokens:
+                matches = self._match(namespace, token)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {
+                        name: score + matches[name]
+                        for name, score in scores.items()
+                        if name in matches
+                    }
+                if not scores:
+                    return {"total": 0, "results": []}
+
+            # Best score first, ties by name
+            ranked = sorted(sorted(scores), key=scores.__getitem__, reverse=True)
+            results = []
+            for name in ranked[offset : offset + limit]:
+                data_product = namespace["products"][name]
+                document = namespace["documents"][name]
+                results.append(
+                    {
+                        "id": data_product.id,
+                        "name": data_product.name,
+                        "kind": data_product.kind,
+                        "team": data_product.team,
+                        "tags": data_product.tags,
+                        "component_count": len(data_product.components),
+                        "score": scores[name],
+                        "matched": sorted(
+                            {self._matched_field(document, token) for token in tokens}
+                        ),
+                    }
+                )
+        return {"total": len(ranked), "results": results}
+
+    @staticmethod
+    def _match(namespace, token: str) -> Dict[str, float]:
+        """Score the products having a term equal to or starting with a token"""
+        terms = namespace["terms"]
+        postings = namespace["postings"]
+        i = bisect.bisect_left(terms, token)
+        if i < len(terms) and terms[i] == token and (
+            i + 1 == len(terms) or not terms[i + 1].startswith(token)
+        ):
+            # Exact match only, the common case: the posting is the result
+            return postings[token]
+
+        matches = {}
+        while i < len(terms) and terms[i].startswith(token):
+            factor = 1.0 if terms[i] == token else 0.5
+            for name, weight in postings[terms[i]].items():
+                score = weight * factor
+                if score > matches.get(name, 0.0):
+                    matches[name] = score
+            i += 1
+        return matches
+
+    @staticmethod
+    def _matched_field(document: Dict, token: str) -> str:
+        return max(
+            (weight * (1.0 if term == token else 0.5), field)
+            for term, (weight, field) in document.items()
+            if term.startswith(token)
+        )[1]
+
+    @staticmethod
+    def _new_namespace():
+        return {
+            "snapshot": None,
+            "products": {},
+            "postings": {},
+            "terms": [],
+            "documents": {},
+            "columns": {},
+            "tables": defaultdict(set),
+        }
+
+    @staticmethod
+    def _document(data_product: DataProduct, columns) -> Dict:
+        """Map each term of a data product to its best (weight, field)"""
+        document = {}
+
+        def add(text, field):
+            weight = _SEARCH_FIELD_WEIGHTS[field]
+            for token in _search_tokens(text):
+                if weight > document.get(token, (0.0,))[0]:
+                    document[token] = (weight, field)
+
+        add(data_product.name, "name")
+        add(data_product.team, "team")
+        add(data_product.kind, "kind")
+        for tag in data_product.tags:
+            add(tag, "tag")
+        for component in data_product.components:
+            add(component.name, "component")
+            add(component.resource, "resource")
+            for column in columns.get(_component_table_fqn(component), ()):
+                add(column, "column")
+        return document
+
+    def _sync_pending(self, key):
+        with self._lock:
+            snapshot = self._pending.pop(key, None)
+        if snapshot is not None:
+            self._sync(key, snapshot)
+
+    def _sync(self, key, snapshot):
+        with self._lock:
+            namespace = self._namespaces.get(key)
+            if namespace is None:
+                namespace = self._namespaces[key] = self._new_namespace()
+        indexed = namespace["snapshot"]
+        if indexed is snapshot or (
+            indexed is not None and indexed["fetched_at"] > snapshot["fetched_at"]
+        ):
+            return
+
+        # Only this thread mutates the index, so it can be read without the
+        # lock; documents are built before taking it
+        with metrics.phase("search.index"):
+            current = {dp.name: dp for dp in snapshot["data_products"]}
+            removed = [name for name in namespace["products"] if name not in current]
+            changed = {
+                name: (dp, self._document(dp, namespace["columns"]))
+                for name, dp in current.items()
+                if namespace["products"].get(name) != dp
+            }
+            with self._lock:
+                touched = set()
+                for name in removed:
+                    touched.update(self._remove(namespace, name))
+                for name, (data_product, document) in changed.items():
+                    touched.update(self._remove(namespace, name))
+                    touched.update(self._add(namespace, data_product, document))
+                self._update_terms(namespace, touched)
+                namespace["snapshot"] = snapshot
+        logger.info(
+            f"Search index for {key}: {len(changed)} data products indexed, "
+            f"{len(removed)} removed"
+        )
+
+    def _add_columns(self, key, table_fqn: str, columns):
+        with self._lock:
+            namespace = self._namespaces.get(key)
+            if namespace is None:
+                namespace = self._namespaces[key] = self._new_namespace()
+            if namespace["columns"].get(table_fqn) == columns:
+                return
+            namespace["columns"][table_fqn] = columns
+            touched = set()
+            for name in list(namespace["tables"].get(table_fqn, ())):
+                data_product = namespace["products"][name]
+                touched.update(self._remove(namespace, name))
+                touched.update(
+                    self._add(
+                        namespace,
+                        data_product,
+                        self._document(data_product, namespace["columns"]),
+                    )
+                )
+            self._update_terms(namespace, touched)
+
+    def _invalidate(self, project_id, location):
+        with self._lock:
+            for key in list(self._namespaces):
+                if (project_id is None or key[0] == project_id) and (
+                    location is None or key[1] == location
+                ):
+                    del self._namespaces[key]
+
+    @staticmethod
+    def _add(namespace, data_product: DataProduct, document: Dict):
+        name = data_product.name
+        namespace["products"][name] = data_product
+        namespace["documents"][name] = document
+        for component in data_product.components:
+            namespace["tables"][_component_table_fqn(component)].add(name)
+        postings = namespace["postings"]
+        for term, (weight, _) in document.items():
+            postings.setdefault(term, {})[name] = weight
+        return document.keys()
+
+    @staticmethod
+    def _remove(namespace, name: str):
+        data_product = namespace["products"].pop(name, None)
+        if data_product is None:
+            return ()
+        for component in data_product.components:
+            namespace["tables"][_component_table_fqn(component)].discard(name)
+        document = namespace["documents"].pop(name)
+        postings = namespace["postings"]
+        for term in document:
+            postings[term].pop(name, None)
+        return document.keys()
+
+    @staticmethod
+    def _update_terms(namespace, touched):
+        """Keep the sorted term list in line with the postings"""
+        postings = namespace["postings"]
+        terms = namespace["terms"]
+        if len(touched) > len(terms) // 8:
+            for term in touched:
+                if not postings.get(term):
+                    postings.pop(term, None)
+            namespace["terms"] = sorted(postings)
+            return
+        for term in touched:
+            i = bisect.bisect_left(terms, term)
+            present = i < len(terms) and terms[i] == term
+            if postings.get(term):
+                if not present:
+                    terms.insert(i, term)
+            else:
+                postings.pop(term, None)
+                if present:
+                    del terms[i]
+
+
+def _component_table_fqn(component: Component) -> Optional[str]:
+    parsed = _parse_bq_resource(component.resource)
+    return ".".join(parsed) if parsed else None
+
+
+search_index = SearchIndex()
+
+
+class CatalogSnapshotCache:
+    """In-process cache of data product snapshots keyed by (project_id, location).
+
+    Fresh snapshots are served directly. Once a snapshot is older than the TTL
+    it is still served while a background thread rebuilds it
+    (stale-while-revalidate), so only the very first request for a key pays
+    for the full catalog crawl. With a CatalogStore, snapshots are persisted
+    and a restarted process serves them from disk, keeping their age.
+    Every snapshot stored or restored is handed to `on_store`, if given.
+    """
+
+    def __init__(
+        self,
+        loader,
+        ttl_seconds: float,
+        refresh_interval_seconds: float,
+        store: CatalogStore = None,
+        on_store=None,
+    ):
+        self._loader = loader
+        self._ttl_seconds = ttl_seconds
+        self._refresh_interval_seconds = refresh_interval_seconds
+        self._store = store
+        self._on_store = on_store
+        self._snapshots = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresher = None
+
+    def get(self, project_id: str, location: str, force_refresh: bool = False):
+        """Return the snapshot for a key, loading it synchronously if missing"""
+        key = (project_id, location)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is None and not force_refresh:
+            snapshot = self._restore(key)
+
+        if snapshot is None or force_refresh:
+            metrics.cache_lookup(
+                "catalog_snapshot", "refresh" if force_refresh else "miss"
+            )
+            return self._load(key)
+
+        if time.monotonic() - snapshot["fetched_at"] > self._ttl_seconds:
+            metrics.cache_lookup("catalog_snapshot", "stale")
+            self.refresh_in_background(project_id, location)
+        else:
+            metrics.cache_lookup("catalog_snapshot", "hit")
+        return snapshot
+
+    def peek(self, project_id: str, location: str):
+        """Return the cached snapshot for a key, if any, without loading it"""
+        key = (project_id, location)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            snapshot = self._restore(key)
+        metrics.cache_lookup("catalog_snapshot", "miss" if snapshot is None else "hit")
+        return snapshot
+
+    def refresh_in_background(self, project_id: str, location: str) -> bool:
+        """Schedule a refresh for a key unless one is already in flight"""
+        key = (project_id, location)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                self._load(key)
+            except Exception as e:
+                logger.error(
+                    f"Background refresh failed for {key}, "
+                    f"keeping stale snapshot: {str(e)}"
+                )
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(
+            target=_refresh, name=f"catalog-refresh-{project_id}", daemon=True
+        ).start()
+        return True
+
+    def invalidate(self, project_id: str = None, location: str = None) -> int:
+        """Drop cached snapshots matching the given project and/or location"""
+        with self._lock:
+            keys = [
+                key
+                for key in self._snapshots
+                if (project_id is None or key[0] == project_id)
+                and (location is None or key[1] == location)
+            ]
+            for key in keys:
+                del self._snapshots[key]
+        if self._store is not None:
+            self._store.delete(["data_products"], project_id, location)
+        return len(keys)
+
+    def start(self):
+        """Start the periodic refresher that keeps known keys warm.
+
+        Persisted snapshots are loaded first, so the refresher also renews
+        the keys served before a restart.
+        """
+        if self._store is not None:
+            for project_id, location in self._store.namespaces("data_products"):
+                self._restore((project_id, location))
+        if self._refresh_interval_seconds <= 0 or self._refresher is not None:
+            return
+        self._stop_event.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="catalog-refresher", daemon=True
+        )
+        self._refresher.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+    def store(
+        self, project_id: str, location: str, data_products: List[DataProduct]
+    ):
+        """Store a freshly crawled snapshot for a key"""
+        snapshot = {
+            "data_products": data_products,
+            "fetched_at": time.monotonic(),
+            "refreshed_at": datetime.now().isoformat(),
+        }
+        with self._lock:
+            self._snapshots[(project_id, location)] = snapshot
+        if self._on_store is not None:
+            self._on_store(project_id, location, snapshot)
+        if self._store is not None:
+            try:
+                self._store.save(
+                    "data_products",
+                    project_id,
+                    location,
+                    {
+                        "data_products": [dp.to_dict() for dp in data_products],
+                        "refreshed_at": snapshot["refreshed_at"],
+                    },
+                )
+            except Exception as e:
+                logger.warning(f"Error persisting catalog snapshot: {str(e)}")
+        return snapshot
+
+    def _load(self, key):
+        # Concurrent loads of a key (first requests, forced refreshes and
+        # background refreshes) share a single crawl
+        return single_flight.do(
+            ("catalog",) + key, lambda: self.store(*key, self._loader(*key))
+        )
+
+    def _restore(self, key):
+        """Load a persisted snapshot into memory, keeping its age"""
+        if self._store is None:
+            return None
+        try:
+            stored = self._store.load("data_products", *key)
+        except Exception as e:
+            logger.warning(f"Error reading persisted catalog snapshot: {str(e)}")
+            return None
+        if stored is None:
+            return None
+
+        payload, age = stored
+        snapshot = {
+            "data_products": [
+                DataProduct.from_dict(dp) for dp in payload["data_products"]
+            ],
+            "fetched_at": _age_to_monotonic(age),
+            "refreshed_at": payload["refreshed_at"],
+        }
+        with self._lock:
+            # Never replace a snapshot loaded meanwhile
+            current = self._snapshots.setdefault(key, snapshot)
+        if current is snapshot and self._on_store is not None:
+            self._on_store(*key, snapshot)
+        return current
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self._refresh_interval_seconds):
+            now = time.monotonic()
+            with self._lock:
+                stale_keys = [
+                    key
+                    for key, snapshot in self._snapshots.items()
+                    if now - snapshot["fetched_at"] > self._ttl_seconds
+                ]
+            for project_id, location in stale_keys:
+                self.refresh_in_background(project_id, location)
+
+
+catalog_cache = CatalogSnapshotCache(
+    catalog_sync.sync,
+    ttl_seconds=CATALOG_CACHE_TTL_SECONDS,
+    refresh_interval_seconds=CATALOG_CACHE_REFRESH_INTERVAL_SECONDS,
+    store=catalog_store,
+    on_store=search_index.schedule_sync,
+)
+
+
+@app.on_event("startup")
+async def start_catalog_cache():
+    catalog_cache.start()
+
+
+@app.on_event("shutdown")
+async def stop_catalog_cache():
+    catalog_cache.stop()
+
+
+@app.on_event("startup")
+async def start_clients():
+    clients.start()
+
+
+@app.on_event("shutdown")
+async def close_clients():
+    for executor in (
+        io_executor,
+        component_executor,
+        scan_job_executor,
+        lineage_executor,
+    ):
+        executor.shutdown(wait=False, cancel_futures=True)
+    clients.close()
+
+
+@app.on_event("shutdown")
+async def close_catalog_store():
+    if catalog_store is not None:
+        catalog_store.close()
+
+
+def _ndjson_line(payload: Dict) -> bytes:
+    return _dumps(payload) + b"\n"
+
+
+def _ndjson_data_products(data_products: List[DataProduct]):
+    """Yield the NDJSON lines listing data products in fixed-size batches"""
+    for i in range(0, len(data_products), STREAM_SNAPSHOT_BATCH_SIZE):
+        yield _ndjson_line(
+            {
+                "type": "data_products",
+                "data_products": [
+                    dp.to_dict()
+                    for dp in data_products[i : i + STREAM_SNAPSHOT_BATCH_SIZE]
+                ],
+            }
+        )
+
+
+async def _stream_data_products(
+    project_id: str, location: str, refresh: bool, data_product: str = None
+):
+    """Stream data products as NDJSON while the catalog is being read.
+
+    Each line is {"type": "data_products", "data_products": [...]}; a data
+    product spread over several entry groups arrives in several lines and
+    its components must be merged by id. The stream ends with
+    {"type": "complete", ...}, or {"type": "error", ...} if the crawl fails.
+
+    Listings are loaded through the catalog snapshot cache, so a streamed
+    load shares the crawl or incremental sync of every other load of the
+    key; the batches of a full crawl are streamed as soon as they are read.
+    """
+    try:
+        snapshot = (
+            None
+            if refresh
+            else await _run_blocking(catalog_cache.peek, project_id, location)
+        )
+        if snapshot is None and data_product and not refresh:
+            data_products = await _run_blocking(
+                single_flight.do,
+                ("data_product_crawl", project_id, location, data_product),
+                _crawl_data_products,
+                project_id,
+                location,
+                data_product=data_product,
+            )
+        elif snapshot is not None:
+            data_products = [
+                dp
+                for dp in snapshot["data_products"]
+                if not data_product or dp.name == data_product
+            ]
+        else:
+            data_products = None
+    except asyncio.TimeoutError:
+        yield _ndjson_line({"type": "error", "detail": _TIMEOUT_DETAIL})
+        return
+    except Exception as e:
+        logger.error(f"Error streaming data products: {str(e)}")
+        yield _ndjson_line({"type": "error", "detail": str(e)})
+        return
+
+    if data_products is not None:
+        for line in _ndjson_data_products(data_products):
+            yield line
+        yield _ndjson_line({"type": "complete", "data_products": len(data_products)})
+        return
+
+    # Follow the first crawl published for the key, which is the one the
+    # snapshot load below runs or joins. The load keeps running, and stores
+    # its snapshot, when the client disconnects.
+    queue = catalog_crawl_feed.subscribe(project_id, location)
+
+    def _on_loaded(future):
+        if not future.cancelled():
+            future.exception()
+        queue.put_nowait(("loaded", future))
+
+    try:
+        loop = asyncio.get_running_loop()
+        load = loop.run_in_executor(
+            io_executor,
+            functools.partial(
+                contextvars.copy_context().run,
+                catalog_cache.get,
+                project_id,
+                location,
+                force_refresh=refresh,
+            ),
+        )
+        load.add_done_callback(_on_loaded)
+        crawl = None
+        while True:
+            event = await asyncio.wait_for(
+                queue.get(), timeout=REQUEST_TIMEOUT_SECONDS
+            )
+            if event[0] == "batch":
+                crawl = crawl or event[1]
+                components = [
+                    component
+                    for component in event[2][1]
+                    if not data_product or component.data_product == data_product
+                ]
+                if event[1] is crawl and components:
+                    yield _ndjson_line(
+                        {
+                            "type": "data_products",
+                            "data_products": [
+                                dp.to_dict()
+                                for dp in _group_data_products([components])
+                            ],
+                        }
+                    )
+            elif event[0] == "end":
+                if event[1] is crawl and event[2] is not None:
+                    raise event[2]
+            else:
+                snapshot = event[1].result()
+                break
+    except asyncio.TimeoutError:
+        yield _ndjson_line({"type": "error", "detail": _TIMEOUT_DETAIL})
+        return
+    except Exception as e:
+        logger.error(f"Error streaming data products: {str(e)}")
+        yield _ndjson_line({"type": "error", "detail": str(e)})
+        return
+    finally:
+        catalog_crawl_feed.unsubscribe(project_id, location, queue)
+
+    data_products = [
+        dp
+        for dp in snapshot["data_products"]
+        if not data_product or dp.name == data_product
+    ]
+    if crawl is None:
+        # The load was served without a full crawl (incremental sync)
+        for line in _ndjson_data_products(data_products):
+            yield line
+    yield _ndjson_line({"type": "complete", "data_products": len(data_products)})
+
+
+def _snapshot_body(snapshot) -> bytes:
+    """Return the serialized unfiltered listing of a snapshot.
+
+    It is encoded on first use and kept in the snapshot, so later requests
+    for the full listing send the cached bytes without re-encoding them.
+    """
+    body = snapshot.get("body")
+    if body is None:
+        body = _dumps(
+            {"data_products": [dp.to_dict() for dp in snapshot["data_products"]]}
+        )
+        snapshot["body"] = body
+    return body
+
+
+def _encode_cursor(last_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id}).encode()).decode()
+
+
+def _decode_cursor(cursor: str, kind: type = str):
+    """Decode a cursor, rejecting it unless its position is of the given type.
+
+    Listing cursors hold a data product id and search cursors an offset, so
+    a cursor passed to the wrong endpoint is a client error.
+    """
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"]
+    except Exception:
+        after = None
+    if type(after) is not kind:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    return after
+
+
+def _project_data_product(data_product: DataProduct, fields: List[str]) -> Dict:
+    """Serialize only the requested fields of a data product"""
+    projected = {}
+    for field in fields:
+        if field == "component_count":
+            projected[field] = len(data_product.components)
+        elif field == "components":
+            projected[field] = [
+                component.to_dict() for component in data_product.components
+            ]
+        else:
+            projected[field] = getattr(data_product, field)
+    return projected
+
+
+def _build_data_products_page(
+    data_products: List[DataProduct],
+    name: str = None,
+    kind: str = None,
+    team: str = None,
+    tag: str = None,
+    name_prefix: str = None,
+    fields: str = None,
+    limit: int = None,
+    cursor: str = None,
+) -> Dict:
+    """Filter, paginate and serialize a list of data products.
+
+    Without any of the optional arguments the whole list is serialized
+    unchanged. Pages are ordered by data product id and chained with an
+    opaque cursor.
+    """
+    if name:
+        data_products = [dp for dp in data_products if dp.name == name]
+    if kind:
+        data_products = [dp for dp in data_products if dp.kind == kind]
+    if team:
+        data_products = [dp for dp in data_products if dp.team == team]
+    if tag:
+        data_products = [dp for dp in data_products if tag in dp.tags]
+    if name_prefix:
+        prefix = name_prefix.lower()
+        data_products = [
+            dp for dp in data_products if dp.name.lower().startswith(prefix)
+        ]
+
+    next_cursor = None
+    if limit is not None or cursor:
+        data_products = sorted(data_products, key=lambda dp: dp.id)
+        if cursor:
+            after = _decode_cursor(cursor)
+            data_products = [dp for dp in data_products if dp.id > after]
+        if limit is not None:
+            limit = max(1, min(limit, DATA_PRODUCTS_PAGE_SIZE_MAX))
+            if len(data_products) > limit:
+                data_products = data_products[:limit]
+                next_cursor = _encode_cursor(data_products[-1].id)
+
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = set(requested) - DATA_PRODUCT_FIELDS
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            )
+        data_products = [_project_data_product(dp, requested) for dp in data_products]
+    else:
+        data_products = [dp.to_dict() for dp in data_products]
+
+    page = {"data_products": data_products}
+    if limit is not None or cursor:
+        page["next_cursor"] = next_cursor
+    return page
+
+
+@app.get("/api/data-products", response_class=FastJSONResponse)
+async def get_data_products(
+    project_id: str,
+    location: str,
+    refresh: bool = False,
+    data_product: str = None,
+    stream: bool = False,
+    kind: str = None,
+    team: str = None,
+    tag: str = None,
+    name_prefix: str = None,
+    fields: str = None,
+    limit: int = None,
+    cursor: str = None,
+):
+    """List the data products of a location.
+
+    kind, team, tag and name_prefix filter the products, fields selects the
+    returned product fields (including the virtual component_count), and
+    limit/cursor paginate the result. These apply to non-streaming responses.
+    """
+    if stream:
+        return StreamingResponse(
+            _stream_data_products(project_id, location, refresh, data_product),
+            media_type="application/x-ndjson",
+        )
+
+    try:
+        if data_product and not refresh:
+            # Answer from a cached snapshot when there is one, otherwise run a
+            # crawl restricted to this data product instead of a full one
+            snapshot = await _run_blocking(catalog_cache.peek, project_id, location)
+            if snapshot is None:
+                data_products = await _run_blocking(
+                    single_flight.do,
+                    ("data_product_crawl", project_id, location, data_product),
+                    _crawl_data_products,
+                    project_id,
+                    location,
+                    data_product=data_product,
+                )
+            else:
+                data_products = snapshot["data_products"]
+        else:
+            with metrics.phase("data_products.load"):
+                snapshot = await _run_blocking(
+                    catalog_cache.get, project_id, location, force_refresh=refresh
+                )
+            if not (
+                data_product or kind or team or tag or name_prefix or fields or cursor
+            ) and (limit is None):
+                # The unfiltered listing is sent pre-serialized
+                with metrics.phase("data_products.encode"):
+                    body = await _run_blocking(_snapshot_body, snapshot)
+                return FastJSONResponse(body)
+            data_products = snapshot["data_products"]
+
+        # Filtering a large catalog and encoding the page stay off the loop
+        with metrics.phase("data_products.encode"):
+            body = await _run_blocking(
+                lambda: _dumps(
+                    _build_data_products_page(
+                        data_products,
+                        data_product,
+                        kind,
+                        team,
+                        tag,
+                        name_prefix,
+                        fields,
+                        limit,
+                        cursor,
+                    )
+                )
+            )
+        return FastJSONResponse(body)
+
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    except google_exceptions.PermissionDenied as e:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Permission denied accessing Dataplex: {str(e)}",
+        )
+    except google_exceptions.NotFound as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Project or location not found: {str(e)}",
+        )
+    except Exception as e:
+        logger.error(f"Error fetching from Dataplex: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching from Dataplex: {str(e)}",
+        )
+
+
+@app.post("/api/data-products/invalidate")
+async def invalidate_data_products(project_id: str = None, location: str = None):
+    """Drop cached catalog snapshots so the next request re-crawls Dataplex"""
+    try:
+        invalidated = await _run_blocking(_invalidate_caches, project_id, location)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    return {"invalidated": invalidated}
+
+
+def _invalidate_caches(project_id: str, location: str) -> int:
+    # Runs off the event loop: dropping persisted entries deletes SQLite rows
+    invalidated = catalog_cache.invalidate(project_id, location)
+    catalog_sync.invalidate(project_id, location)
+    table_index.invalidate(project_id, location)
+    data_scan_index.invalidate(project_id, location)
+    search_index.invalidate(project_id, location)
+    product_rollups.invalidate(project_id, location)
+    if catalog_store is not None:
+        catalog_store.delete(["lineage_edges"], project_id, location)
+    return invalidated
+
+
+def _search_data_products(
+    project_id: str, location: str, q: str, offset: int, limit: int
+) -> Dict:
+    snapshot = catalog_cache.get(project_id, location)
+    search_index.ensure(project_id, location, snapshot)
+    return search_index.search(project_id, location, q, offset, limit)
+
+
+@app.get("/api/search", response_class=FastJSONResponse)
+async def search_data_products(
+    project_id: str,
+    location: str,
+    q: str,
+    limit: int = 20,
+    cursor: str = None,
+):
+    """Search data products by name, team, kind, tag, component, resource or
+    column name.
+
+    Every word of `q` must match, as a whole word or as a word prefix.
+    Results are ranked by relevance and paginated with `limit` and the
+    returned `next_cursor`.
+    """
+    if not _search_tokens(q):
+        raise HTTPException(
+            status_code=400, detail="q must contain at least one letter or digit"
+        )
+    offset = _decode_cursor(cursor, int) if cursor else 0
+    if offset < 0:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    limit = max(1, min(limit, DATA_PRODUCTS_PAGE_SIZE_MAX))
+
+    try:
+        with metrics.phase("search.query"):
+            page = await _run_blocking(
+                _search_data_products, project_id, location, q, offset, limit
+            )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    except google_exceptions.PermissionDenied as e:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Permission denied accessing Dataplex: {str(e)}",
+        )
+    except google_exceptions.NotFound as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Project or location not found: {str(e)}",
+        )
+    except Exception as e:
+        logger.error(f"Error searching data products: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching data products: {str(e)}",
+        )
+
+    next_offset = offset + len(page["results"])
+    page["next_cursor"] = (
+        _encode_cursor(next_offset) if next_offset < page["total"] else None
+    )
+    return FastJSONResponse(page)
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "single_flight": single_flight.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Expose request, RPC, phase and cache metrics in Prometheus text format"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+
+    extra_samples = []
+    for kind, counts in single_flight.stats().items():
+        labels = (("kind", kind),)
+        extra_samples.extend(
+            [
+                ("data_roster_single_flight_calls_total", labels, counts["calls"]),
+                (
+                    "data_roster_single_flight_executions_total",
+                    labels,
+                    counts["executions"],
+                ),
+                (
+                    "data_roster_single_flight_coalesced_total",
+                    labels,
+                    counts["coalesced"],
+                ),
+                ("data_roster_single_flight_in_flight", labels, counts["in_flight"]),
+            ]
+        )
+    return PlainTextResponse(
+        metrics.render(extra_samples), media_type="text/plain; version=0.0.4"
+    )
+
+
+def _get_table_schema(table_fqn, project_id):
+    """Get schema information for a BigQuery table from the schema cache"""
+    try:
+        return table_schemas.get(table_fqn, project_id)
+    except NotFound:
+        logger.error(f"Table {table_fqn} not found")
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching schema for {table_fqn}: {str(e)}")
+        return None
+
+
+def _schema_field_to_dict(field) -> Dict:
+    schema_field = {
+        "name": field.name,
+        "type": field.field_type,
+        "mode": field.mode,
+        "description": field.description or "",
+    }
+    if field.fields:
+        schema_field["fields"] = [_schema_field_to_dict(f) for f in field.fields]
+    return schema_field
+
+
+def _fetch_table_schema(table_fqn, project_id) -> Dict:
+    """Get the schema of one table with a get_table call"""
+    client = clients.bigquery(project_id)
+    table = client.get_table(table_fqn, timeout=RPC_TIMEOUT_SECONDS)
+    return {
+        "fields": [_schema_field_to_dict(field) for field in table.schema],
+        "description": table.description or "",
+    }
+
+
+# Names get_table reports for GoogleSQL column types
+_LEGACY_FIELD_TYPES = {
+    "INT64": "INTEGER",
+    "FLOAT64": "FLOAT",
+    "BOOL": "BOOLEAN",
+    "STRUCT": "RECORD",
+}
+_BQ_DATASET_RE = re.compile(r"[A-Za-z0-9.:_-]+\.[A-Za-z0-9_]+")
+
+
+def _legacy_field_type(data_type: str):
+    """Return the (type, mode) get_table reports for a GoogleSQL column type"""
+    mode = "NULLABLE"
+    if data_type.startswith("ARRAY<"):
+        mode = "REPEATED"
+        data_type = data_type[len("ARRAY<") : -1]
+    base_type = re.match(r"\w+", data_type).group(0)
+    return _LEGACY_FIELD_TYPES.get(base_type, base_type), mode
+
+
+def _struct_field_names(data_type: str) -> List[str]:
+    """Return, in order, the field names of a STRUCT or ARRAY<STRUCT> type"""
+    start = data_type.find("STRUCT<")
+    if start < 0:
+        return []
+    names = []
+    member = []
+    depth = 0
+    for char in data_type[start + len("STRUCT<") :]:
+        if char in "<(":
+            depth += 1
+        elif char in ">)":
+            if depth == 0:
+                break
+            depth -= 1
+        elif char == "," and depth == 0:
+            names.append("".join(member))
+            member = []
+            continue
+        member.append(char)
+    names.append("".join(member))
+    return [
+        name[1 : name.index("`", 1)] if name.startswith("`") else name.split()[0]
+        for name in (name.strip() for name in names)
+        if name
+    ]
+
+
+def _option_string(value: Optional[str]) -> str:
+    """Decode a string literal read from INFORMATION_SCHEMA.TABLE_OPTIONS"""
+    if not value:
+        return ""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value.strip('"')
+
+
+_DATASET_SCHEMA_QUERY = """
+SELECT
+  c.table_name,
+  c.column_name,
+  c.is_nullable,
+  c.ordinal_position,
+  f.field_path,
+  f.data_type,
+  f.description,
+  t.last_modified_time,
+  o.option_value AS table_description
+FROM `{dataset}`.INFORMATION_SCHEMA.COLUMNS AS c
+JOIN `{dataset}`.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS AS f
+  USING (table_name, column_name)
+JOIN `{dataset}.__TABLES__` AS t
+  ON t.table_id = c.table_name
+LEFT JOIN `{dataset}`.INFORMATION_SCHEMA.TABLE_OPTIONS AS o
+  ON o.table_name = c.table_name AND o.option_name = 'description'
+WHERE c.is_hidden = 'NO'
+  AND (@all_tables OR c.table_name IN UNNEST(@tables))
+"""
+
+_DATASET_LAST_MODIFIED_QUERY = """
+SELECT table_id, last_modified_time FROM `{dataset}.__TABLES__`
+"""
+
+
+def _query_dataset_schemas(client, dataset: str, tables: List[str] = None) -> Dict:
+    """Read the schemas of the tables of a dataset (all of them, or `tables`)
+    with one INFORMATION_SCHEMA query, nested RECORD fields included"""
+    rows = client.query_and_wait(
+        _DATASET_SCHEMA_QUERY.format(dataset=dataset),
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("all_tables", "BOOL", tables is None),
+                bigquery.ArrayQueryParameter("tables", "STRING", tables or []),
+            ]
+        ),
+        api_timeout=RPC_TIMEOUT_SECONDS,
+        wait_timeout=RPC_TIMEOUT_SECONDS,
+    )
+
+    paths = defaultdict(dict)
+    columns = defaultdict(list)
+    details = {}
+    for row in rows:
+        field_type, mode = _legacy_field_type(row.data_type)
+        if row.field_path == row.column_name:
+            if mode == "NULLABLE" and row.is_nullable == "NO":
+                mode = "REQUIRED"
+            columns[row.table_name].append((row.ordinal_position, row.column_name))
+        paths[row.table_name][row.field_path] = (
+            {
+                "name": row.field_path.rsplit(".", 1)[-1],
+                "type": field_type,
+                "mode": mode,
+                "description": row.description or "",
+            },
+            row.data_type,
+        )
+        details[row.table_name] = (row.last_modified_time, row.table_description)
+
+    def build_field(table_paths, path):
+        field, data_type = table_paths[path]
+        field = dict(field)
+        if field["type"] == "RECORD":
+            field["fields"] = [
+                build_field(table_paths, f"{path}.{name}")
+                for name in _struct_field_names(data_type)
+                if f"{path}.{name}" in table_paths
+            ]
+        return field
+
+    schemas = {}
+    for table_name, (last_modified, description) in details.items():
+        schemas[table_name] = {
+            "last_modified": last_modified,
+            "schema": {
+                "fields": [
+                    build_field(paths[table_name], column)
+                    for _, column in sorted(columns[table_name])
+                ],
+                "description": _option_string(description),
+            },
+        }
+    return schemas
+
+
+def _query_last_modified(client, dataset: str) -> Dict[str, int]:
+    rows = client.query_and_wait(
+        _DATASET_LAST_MODIFIED_QUERY.format(dataset=dataset),
+        api_timeout=RPC_TIMEOUT_SECONDS,
+        wait_timeout=RPC_TIMEOUT_SECONDS,
+    )
+    return {row.table_id: row.last_modified_time for row in rows}
+
+
+class TableSchemaCache:
+    """Schemas of BigQuery tables, fetched a dataset at a time.
+
+    The first lookup in a dataset reads the columns, nested fields and
+    descriptions of all of its tables with one INFORMATION_SCHEMA query.
+    Later lookups are answered from memory. Once a dataset was checked more
+    than `check_seconds` ago, one query reads the last-modified time of its
+    tables and only the tables modified since are read again. Datasets that
+    cannot be queried (e.g. without bigquery.jobs.create) fall back to a
+    get_table call per lookup until the next check.
+    """
+
+    def __init__(self, check_seconds: float, max_datasets: int):
+        self._check_seconds = check_seconds
+        self._datasets = LRUCache(max_entries=max_datasets)
+
+    def get(self, table_fqn: str, project_id: str) -> Optional[Dict]:
+        """Return the schema of a "project.dataset.table", or None if the
+        dataset has no such table"""
+        dataset, _, table_id = table_fqn.rpartition(".")
+        if not _BQ_DATASET_RE.fullmatch(dataset):
+            return _fetch_table_schema(table_fqn, project_id)
+
+        key = (project_id, dataset)
+        entry = self._datasets.get(key)
+        fresh = entry is not None and (
+            time.monotonic() - entry["checked_at"] <= self._check_seconds
+        )
+        if fresh:
+            if entry["fallback"]:
+                return _fetch_table_schema(table_fqn, project_id)
+            if table_id in entry["tables"]:
+                metrics.cache_lookup("table_schemas", "hit")
+                return entry["tables"][table_id]["schema"]
+
+        metrics.cache_lookup(
+            "table_schemas", "miss" if entry is None or fresh else "stale"
+        )
+        entry = single_flight.do(("dataset_schema",) + key, self._refresh, key)
+        if entry["fallback"]:
+            return _fetch_table_schema(table_fqn, project_id)
+        table = entry["tables"].get(table_id)
+        if table is None:
+            raise NotFound(f"Table {table_fqn} not found")
+        return table["schema"]
+
+    def clear(self):
+        self._datasets.clear()
+
+    def _refresh(self, key):
+        project_id, dataset = key
+        entry = self._datasets.get(key)
+        client = clients.bigquery(project_id)
+        try:
+            with metrics.phase("table_schemas.refresh"):
+                if entry is None or entry["fallback"]:
+                    tables = _query_dataset_schemas(client, dataset)
+                else:
+                    last_modified = _query_last_modified(client, dataset)
+                    tables = {
+                        table_id: table
+                        for table_id, table in entry["tables"].items()
+                        if last_modified.get(table_id) == table["last_modified"]
+                    }
+                    modified = [t for t in last_modified if t not in tables]
+                    if modified:
+                        tables.update(_query_dataset_schemas(client, dataset, modified))
+        except google_exceptions.GoogleAPICallError as e:
+            if isinstance(e, NotFound):
+                raise
+            logger.warning(
+                f"Cannot query the schemas of dataset {dataset}, "
+                f"falling back to get_table: {str(e)}"
+            )
+            tables = {}
+            fallback = True
+        else:
+            fallback = False
+        entry = {"tables": tables, "fallback": fallback, "checked_at": time.monotonic()}
+        self._datasets.put(key, entry)
+        return entry
+
+
+table_schemas = TableSchemaCache(
+    check_seconds=SCHEMA_CACHE_CHECK_SECONDS,
+    max_datasets=SCHEMA_CACHE_MAX_DATASETS,
+)
+
+
+def _schema_field_paths(fields, prefix: str = "") -> List[str]:
+    """Return the dotted paths of schema fields, nested fields included"""
+    paths = []
+    for field in fields:
+        path = prefix + field["name"]
+        paths.append(path)
+        paths.extend(_schema_field_paths(field.get("fields", ()), path + "."))
+    return paths
+
+
+def _parse_bq_resource(resource: str):
+    """Return (project_id, dataset_id, table_id) for a BigQuery table resource"""
+    match = re.search(r"projects/([^/]+)/datasets/([^/]+)/tables/([^/]+)$", resource)
+    return match.groups() if match else None
+
+
+class TableEntryIndex:
+    """Index of the @bigquery entry group keyed by (project_id, location).
+
+    Each location is listed once and then answers lookups by table_id or by
+    fully qualified name ("project.dataset.table") with a dictionary hit.
+    Misses re-list the entry group (at most once per miss refresh interval)
+    and merge new entries into the index; the whole index is rebuilt once it
+    is older than the TTL. With a CatalogStore, indexes are persisted; a
+    persisted index older than the TTL is served while it is rebuilt in the
+    background.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        miss_refresh_seconds: float,
+        store: CatalogStore = None,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._miss_refresh_seconds = miss_refresh_seconds
+        self._store = store
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._build_locks = defaultdict(threading.Lock)
+
+    def lookup(self, project_id: str, location: str, table: str):
+        """Find a table by table_id or fully qualified name.
+
+        Returns a dict with the entry resource and the parsed project,
+        dataset and table ids, or None if the table is unknown.
+        """
+        key = (project_id, location)
+        index = self._get_index(key)
+        record = self._find(index, table)
+        if record is not None:
+            metrics.cache_lookup("table_index", "hit")
+            return record
+        metrics.cache_lookup("table_index", "miss")
+
+        if time.monotonic() - index["listed_at"] > self._miss_refresh_seconds:
+            index = self._refresh(key, rebuild=False, listed_before=index["listed_at"])
+            record = self._find(index, table)
+        return record
+
+    def invalidate(self, project_id: str = None, location: str = None) -> int:
+        with self._lock:
+            keys = [
+                key
+                for key in self._indexes
+                if (project_id is None or key[0] == project_id)
+                and (location is None or key[1] == location)
+            ]
+            for key in keys:
+                del self._indexes[key]
+        if self._store is not None:
+            self._store.delete(["table_index"], project_id, location)
+        return len(keys)
+
+    @staticmethod
+    def _find(index, table: str):
+        table = table.replace("bigquery:", "")
+        return index["by_fqn"].get(table) or index["by_table_id"].get(table)
+
+    def _get_index(self, key):
+        with self._lock:
+            index = self._indexes.get(key)
+        if index is None:
+            index = self._restore(key)
+            if index is None:
+                return self._refresh(key, rebuild=True, listed_before=None)
+            return index
+        if time.monotonic() - index["built_at"] > self._ttl_seconds:
+            return self._refresh(key, rebuild=True, listed_before=index["listed_at"])
+        return index
+
+    def _restore(self, key):
+        """Load a persisted index into memory, keeping its age, and rebuild
+        it in the background if it is stale"""
+        if self._store is None:
+            return None
+        try:
+            stored = self._store.load("table_index", *key)
+        except Exception as e:
+            logger.warning(f"Error reading persisted table index: {str(e)}")
+            return None
+        if stored is None:
+            return None
+
+        payload, age = stored
+        index = {
+            "by_table_id": {},
+            "by_fqn": {},
+            "built_at": _age_to_monotonic(age + payload["built_age"]),
+            "listed_at": _age_to_monotonic(age),
+        }
+        for record in payload["records"]:
+            index["by_table_id"].setdefault(record["table_id"], record)
+            index["by_fqn"][record["table_fqn"]] = record
+        with self._lock:
+            index = self._indexes.setdefault(key, index)
+        if time.monotonic() - index["built_at"] > self._ttl_seconds:
+            threading.Thread(
+                target=self._refresh_quietly,
+                args=(key, index["listed_at"]),
+                name=f"table-index-refresh-{key[0]}",
+                daemon=True,
+            ).start()
+        return index
+
+    def _refresh_quietly(self, key, listed_before):
+        try:
+            self._refresh(key, rebuild=True, listed_before=listed_before)
+        except Exception as e:
+            logger.error(f"Background table index rebuild failed for {key}: {str(e)}")
+
+    def _refresh(self, key, rebuild: bool, listed_before):
+        with self._build_locks[key]:
+            # Another request may have listed the group while we waited
+            with self._lock:
+                index = self._indexes.get(key)
+            if index is not None and index["listed_at"] != listed_before:
+                return index
+
+            if rebuild or index is None:
+                index = {"by_table_id": {}, "by_fqn": {}, "built_at": time.monotonic()}
+            else:
+                index = {
+                    "by_table_id": dict(index["by_table_id"]),
+                    "by_fqn": dict(index["by_fqn"]),
+                    "built_at": index["built_at"],
+                }
+
+            with metrics.phase("table_index.list"):
+                for entry in self._list_entries(*key):
+                    self._add(index, entry)
+            index["listed_at"] = time.monotonic()
+
+            with self._lock:
+                self._indexes[key] = index
+            if self._store is not None:
+                try:
+                    self._store.save(
+                        "table_index",
+                        *key,
+                        {
+                            "records": list(index["by_fqn"].values()),
+                            "built_age": index["listed_at"] - index["built_at"],
+                        },
+                    )
+                except Exception as e:
+                    logger.warning(f"Error persisting table index: {str(e)}")
+            return index
+
+    @staticmethod
+    def _add(index, entry: dataplex_v1.Entry):
+        resource = entry.entry_source.resource
+        parsed = _parse_bq_resource(resource)
+        if not parsed:
+            return
+        record = {
+            "resource": resource,
+            "project_id": parsed[0],
+            "dataset_id": parsed[1],
+            "table_id": parsed[2],
+            "table_fqn": ".".join(parsed),
+        }
+        # Keep the first entry listed for a table_id, as the linear scan did
+        index["by_table_id"].setdefault(record["table_id"], record)
+        index["by_fqn"][record["table_fqn"]] = record
+
+    @staticmethod
+    @retry.Retry(
+        predicate=retry.if_exception_type(google_exceptions.ServiceUnavailable)
+    )
+    def _list_entries(project_id: str, location: str):
+        catalog_client = clients.catalog()
+        parent = f"projects/{project_id}/locations/{location}/entryGroups/@bigquery"
+        request = dataplex_v1.ListEntriesRequest(parent=parent, page_size=1000)
+        return list(
+            catalog_client.list_entries(request=request, timeout=RPC_TIMEOUT_SECONDS)
+        )
+
+
+table_index = TableEntryIndex(
+    ttl_seconds=TABLE_INDEX_TTL_SECONDS,
+    miss_refresh_seconds=TABLE_INDEX_MISS_REFRESH_SECONDS,
+    store=catalog_store,
+)
+
+
+def _build_table_profile(table_entry, project_id, location, scan_client, history=1):
+    """Builds the schema, profile and quality payload of an indexed table.
+
+    Concurrent builds for the same table and history share one execution.
+    """
+    return single_flight.do(
+        ("table_profile", project_id, location, table_entry["table_fqn"], history),
+        _load_table_profile,
+        table_entry,
+        project_id,
+        location,
+        scan_client,
+        history,
+    )
+
+
+def _load_table_profile(table_entry, project_id, location, scan_client, history):
+    # Construct the fully qualified name
+    dataset_id = table_entry["dataset_id"]
+    table_fqn = f"{project_id}.{dataset_id}.{table_entry['table_id']}"
+
+    # Get schema information
+    with metrics.phase("profile.schema"):
+        schema_info = _get_table_schema(table_fqn, project_id)
+    if schema_info:
+        search_index.add_columns(
+            project_id, location, table_fqn, _schema_field_paths(schema_info["fields"])
+        )
+
+    # Get existing profile and quality data
+    with metrics.phase("profile.scan_jobs"):
+        results = _get_table_profile_quality(
+            True, table_fqn, project_id, location, scan_client, history
+        )
+
+    # Add schema information to the response
+    return {
+        "data_profile": results["data_profile"],
+        "data_quality": results["data_quality"],
+        "schema": schema_info,
+    }
+
+
+@app.get("/api/data-products/{table_id}/profile", response_class=FastJSONResponse)
+async def get_table_profile(
+    table_id: str, project_id: str, location: str, history: int = 1
+):
+    """Get profile and quality information for a BigQuery table.
+
+    `history` is the number of most recent succeeded jobs returned per scan
+    (1 by default, capped at PROFILE_HISTORY_MAX for trend charts).
+    """
+    try:
+        history = max(1, min(history, PROFILE_HISTORY_MAX))
+
+        # Find the table entry to get the correct dataset
+        table_entry = await _run_blocking(
+            table_index.lookup, project_id, location, table_id
+        )
+
+        if not table_entry:
+            logger.warning(f"No matching entry found for table_id: {table_id}")
+            return {"data_profile": [], "data_quality": [], "schema": None}
+
+        # Resolve the client in the worker: building it may block on auth
+        return FastJSONResponse(
+            await _run_blocking(
+                lambda: _build_table_profile(
+                    table_entry, project_id, location, clients.data_scans(), history
+                )
+            )
+        )
+
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    except Exception as e:
+        logger.error(f"Error getting table profile: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error getting table profile: {str(e)}"
+        )
+
+
+def _split_table_fqn(table_fqn):
+    """Splits a fully qualified table name into its components."""
+    try:
+        pattern = r"^([^.]+)[\.:]([^.]+)\.([^.]+)"
+        logger.debug(f"Splitting table FQN: {table_fqn}.")
+        match = re.search(pattern, table_fqn)
+        return match.group(1), match.group(2), match.group(3)
+    except Exception as e:
+        logger.error(f"Exception: {e}.")
+        raise e
+
+
+def _construct_bq_resource_string(table_fqn):
+    """Constructs a BigQuery resource string for use in API calls."""
+    try:
+        project_id, dataset_id, table_id = _split_table_fqn(table_fqn)
+        return f"//bigquery.googleapis.com/projects/{project_id}/datasets/{dataset_id}/tables/{table_id}"
+    except Exception as e:
+        logger.error(f"Exception: {e}.")
+        raise e
+
+
+class DataScanIndex:
+    """Index of data scans by BigQuery resource string, keyed by
+    (project_id, location).
+
+    All scans of a location are listed once and grouped by the resource they
+    scan, so finding the scans of a table is a dictionary hit. The index is
+    rebuilt once it is older than the TTL. With a CatalogStore, indexes are
+    persisted; a persisted index older than the TTL is served while it is
+    rebuilt in the background.
+    """
+
+    def __init__(self, ttl_seconds: float, store: CatalogStore = None):
+        self._ttl_seconds = ttl_seconds
+        self._store = store
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._build_locks = defaultdict(threading.Lock)
+
+    def scan_names(self, project_id: str, location: str, resource: str, scan_client):
+        """Return the names of the scans whose data resource is `resource`"""
+        key = (project_id, location)
+        with self._lock:
+            index = self._indexes.get(key)
+
+        if index is None:
+            index = self._restore(key, scan_client)
+            if index is None:
+                metrics.cache_lookup("data_scan_index", "miss")
+                index = self._build(key, scan_client, stale=None)
+            else:
+                metrics.cache_lookup("data_scan_index", "hit")
+        elif time.monotonic() - index["built_at"] > self._ttl_seconds:
+            metrics.cache_lookup("data_scan_index", "expired")
+            index = self._build(key, scan_client, stale=index)
+        else:
+            metrics.cache_lookup("data_scan_index", "hit")
+        return list(index["scans"].get(resource, []))
+
+    def invalidate(self, project_id: str = None, location: str = None) -> int:
+        with self._lock:
+            keys = [
+                key
+                for key in self._indexes
+                if (project_id is None or key[0] == project_id)
+                and (location is None or key[1] == location)
+            ]
+            for key in keys:
+                del self._indexes[key]
+        if self._store is not None:
+            self._store.delete(["data_scan_index"], project_id, location)
+        return len(keys)
+
+    def _restore(self, key, scan_client):
+        """Load a persisted index into memory, keeping its age, and rebuild
+        it in the background if it is stale"""
+        if self._store is None:
+            return None
+        try:
+            stored = self._store.load("data_scan_index", *key)
+        except Exception as e:
+            logger.warning(f"Error reading persisted data scan index: {str(e)}")
+            return None
+        if stored is None:
+            return None
+
+        payload, age = stored
+        with self._lock:
+            index = self._indexes.setdefault(
+                key, {"scans": payload["scans"], "built_at": _age_to_monotonic(age)}
+            )
+        if time.monotonic() - index["built_at"] > self._ttl_seconds:
+            threading.Thread(
+                target=self._build_quietly,
+                args=(key, scan_client, index),
+                name=f"data-scan-index-refresh-{key[0]}",
+                daemon=True,
+            ).start()
+        return index
+
+    def _build_quietly(self, key, scan_client, stale):
+        try:
+            self._build(key, scan_client, stale)
+        except Exception as e:
+            logger.error(
+                f"Background data scan index rebuild failed for {key}: {str(e)}"
+            )
+
+    def _build(self, key, scan_client, stale):
+        with self._build_locks[key]:
+            # Another request may have rebuilt the index while we waited
+            with self._lock:
+                index = self._indexes.get(key)
+            if index is not None and index is not stale:
+                return index
+
+            project_id, location = key
+            scans = defaultdict(list)
+            with metrics.phase("data_scan_index.list"):
+                for scan in scan_client.list_data_scans(
+                    parent=f"projects/{project_id}/locations/{location}",
+                    timeout=RPC_TIMEOUT_SECONDS,
+                ):
+                    scans[scan.data.resource].append(scan.name)
+
+            index = {"scans": dict(scans), "built_at": time.monotonic()}
+            with self._lock:
+                self._indexes[key] = index
+            if self._store is not None:
+                try:
+                    self._store.save(
+                        "data_scan_index", *key, {"scans": index["scans"]}
+                    )
+                except Exception as e:
+                    logger.warning(f"Error persisting data scan index: {str(e)}")
+            return index
+
+
+data_scan_index = DataScanIndex(
+    ttl_seconds=DATA_SCAN_INDEX_TTL_SECONDS, store=catalog_store
+)
+
+
+def _get_table_scan_reference(table_fqn, project_id, location, scan_client):
+    """Retrieves data scan references for a BigQuery table."""
+    try:
+        # logger.info(f"Getting table scan reference for table: {table_fqn}.")
+        bq_resource_string = _construct_bq_resource_string(table_fqn)
+        # logger.info(f"Looking for scans with resource: {bq_resource_string}")
+        scan_references = data_scan_index.scan_names(
+            project_id, location, bq_resource_string, scan_client
+        )
+        # logger.info(f"Found scan references: {scan_references}")
+        return scan_references
+    except Exception as e:
+        logger.error(f"Exception: {e}.")
+        raise e
+
+
+def _format_quality_result(quality_result) -> Dict:
+    """Formats a data quality scan result for the API response."""
+    formatted_quality = {"dimensions": [], "rules": []}
+
+    # Format dimensions
+    for dim in quality_result.dimensions:
+        formatted_quality["dimensions"].append(
+            {
+                "dimension": {"name": dim.dimension.name},
+                "score": float(dim.score),
+                "passed": dim.passed,
+            }
+        )
+
+    # Format rules from quality_result.rules
+    for rule in quality_result.rules:
+        rule_info = {
+            "column": rule.rule.column,
+            "dimension": rule.rule.dimension,
+            "passed": rule.passed,
+            "passRatio": float(rule.pass_ratio),
+            "passedCount": int(rule.passed_count),
+            "evaluatedCount": int(rule.evaluated_count),
+            "failing_rows_query": rule.failing_rows_query,
+            "rule": {
+                "non_null_expectation": (
+                    bool(rule.rule.non_null_expectation)
+                    if hasattr(rule.rule, "non_null_expectation")
+                    else None
+                ),
+                "uniqueness_expectation": (
+                    bool(rule.rule.uniqueness_expectation)
+                    if hasattr(rule.rule, "uniqueness_expectation")
+                    else None
+                ),
+                "set_expectation": (
+                    {
+                        "values": list(rule.rule.set_expectation.values),
+                    }
+                    if hasattr(rule.rule, "set_expectation")
+                    else None
+                ),
+                "row_condition_expectation": (
+                    {
+                        "sql_expression": rule.rule.row_condition_expectation.sql_expression
+                    }
+                    if hasattr(rule.rule, "row_condition_expectation")
+                    else None
+                ),
+            },
+        }
+        formatted_quality["rules"].append(rule_info)
+
+    return formatted_quality
+
+
+def _format_profile_result(profile) -> Dict:
+    """Formats a data profile scan result for the API response."""
+    formatted_profile = {
+        "rowCount": int(profile.row_count),
+        "fields": [],
+    }
+
+    # Process each field in the profile
+    if hasattr(profile, "profile") and hasattr(profile.profile, "fields"):
+        for field in profile.profile.fields:
+            field_info = {
+                "name": field.name,
+                "type": field.type_,
+                "mode": field.mode,
+                "nullCount": 0,
+                "distinctCount": 0,
+                "topNValues": [],
+                "profile": {
+                    "minLength": 0,
+                    "maxLength": 0,
+                    "avgLength": 0.0,
+                },
+            }
+
+            if hasattr(field, "profile"):
+                profile_info = field.profile
+                # Add distinct ratio
+                field_info["distinctRatio"] = profile_info.distinct_ratio
+
+                # Add top N values with their counts and ratios
+                if hasattr(profile_info, "top_n_values"):
+                    for value in profile_info.top_n_values:
+                        field_info["topNValues"].append(
+                            {
+                                "value": str(value.value),
+                                "count": int(value.count),
+                                "ratio": float(value.ratio),
+                            }
+                        )
+
+                # Add string profile if available
+                if hasattr(profile_info, "string_profile"):
+                    field_info["profile"].update(
+                        {
+                            "minLength": int(profile_info.string_profile.min_length),
+                            "maxLength": int(profile_info.string_profile.max_length),
+                            "avgLength": float(
+                                profile_info.string_profile.average_length
+                            ),
+                        }
+                    )
+
+                # Calculate null and distinct counts
+                total_rows = profile.row_count
+                field_info["nullRatio"] = float(profile_info.null_ratio)
+                field_info["nullCount"] = int(total_rows * profile_info.null_ratio)
+                field_info["distinctCount"] = (
+                    int(total_rows * profile_info.distinct_ratio)
+                    if hasattr(profile_info, "distinct_ratio")
+                    else 0
+                )
+
+            formatted_profile["fields"].append(field_info)
+
+    return formatted_profile
+
+
+class ScanJobResultCache:
+    """LRU cache of formatted results of finished scan jobs, keyed by job name.
+
+    A succeeded DataScanJob never changes, so its formatted quality and
+    profile results can be reused forever. The in-memory cache is bounded by
+    both an entry count and an approximate byte size; with a CatalogStore,
+    results are also persisted under the project and location of the job
+    and survive restarts.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, store: CatalogStore = None):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._store = store
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, job_name: str):
+        with self._lock:
+            cached = self._entries.get(job_name)
+            if cached is not None:
+                self._entries.move_to_end(job_name)
+                metrics.cache_lookup("scan_job_results", "hit")
+                return cached[0]
+
+        stored = None
+        if self._store is not None:
+            try:
+                stored = self._store.load(
+                    "scan_job", *self._namespace(job_name), job_name
+                )
+            except Exception as e:
+                logger.warning(f"Error reading persisted scan job result: {str(e)}")
+        if stored is None:
+            metrics.cache_lookup("scan_job_results", "miss")
+            return None
+
+        metrics.cache_lookup("scan_job_results", "store_hit")
+        result = stored[0]
+        self._remember(job_name, result, len(_dumps(result)))
+        return result
+
+    def put(self, job_name: str, result: Dict):
+        size = None
+        if self._store is not None:
+            try:
+                size = self._store.save(
+                    "scan_job", *self._namespace(job_name), result, key=job_name
+                )
+            except Exception as e:
+                logger.warning(f"Error persisting scan job result: {str(e)}")
+        if size is None:
+            size = len(_dumps(result))
+        self._remember(job_name, result, size)
+
+    def clear(self):
+        """Drop the in-memory entries; persisted results are kept"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @staticmethod
+    def _namespace(job_name: str):
+        match = re.match(r"projects/([^/]+)/locations/([^/]+)/", job_name)
+        return match.groups() if match else ("", "")
+
+    def _remember(self, job_name: str, result: Dict, size: int):
+        with self._lock:
+            previous = self._entries.pop(job_name, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[job_name] = (result, size)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self._max_entries or self._bytes > self._max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+
+scan_job_cache = ScanJobResultCache(
+    max_entries=SCAN_JOB_CACHE_MAX_ENTRIES,
+    max_bytes=SCAN_JOB_CACHE_MAX_BYTES,
+    store=catalog_store
+    or (CatalogStore(SCAN_JOB_CACHE_PATH) if SCAN_JOB_CACHE_PATH else None),
+)
+
+
+def _fetch_formatted_scan_job(scan_client, job_name: str):
+    """Fetches a scan job and returns its formatted quality and profile
+    results, or None if the job has not succeeded."""
+    cached = scan_job_cache.get(job_name)
+    if cached is not None:
+        return cached
+
+    job_result = scan_client.get_data_scan_job(
+        request=GetDataScanJobRequest(name=job_name, view="FULL"),
+        timeout=RPC_TIMEOUT_SECONDS,
+    )
+    if job_result.state != DataScanJob.State.SUCCEEDED:
+        return None
+
+    formatted = {
+        "data_quality": (
+            _format_quality_result(job_result.data_quality_result)
+            if job_result.data_quality_result
+            else None
+        ),
+        "data_profile": (
+            _format_profile_result(job_result.data_profile_result)
+            if job_result.data_profile_result
+            else None
+        ),
+    }
+    scan_job_cache.put(job_name, formatted)
+    return formatted
+
+
+def _list_latest_succeeded_jobs(scan_client, table_scan_reference, history):
+    """Lists the `history` most recent succeeded jobs of a scan.
+
+    Jobs are listed newest first in their BASIC view, which already carries
+    the job state, so paging stops as soon as enough succeeded jobs are found.
+    """
+    scan_jobs = scan_client.list_data_scan_jobs(
+        ListDataScanJobsRequest(
+            parent=table_scan_reference,
+            page_size=max(history, PROFILE_JOBS_PAGE_SIZE),
+        ),
+        timeout=RPC_TIMEOUT_SECONDS,
+    )
+
+    jobs = []
+    for job in scan_jobs:
+        if job.state == DataScanJob.State.SUCCEEDED:
+            jobs.append(job)
+            if len(jobs) >= history:
+                break
+    return jobs
+
+
+def _get_table_profile_quality(
+    use_enabled, table_fqn, project_id, location, scan_client, history=1
+):
+    """Retrieves both profile and quality information for a BigQuery table.
+
+    Only the `history` most recent succeeded jobs of each scan are fetched
+    in their FULL view and returned, newest first.
+    """
+    try:
+        if use_enabled:
+            data_profile_results = []
+            data_quality_results = []
+            table_scan_references = _get_table_scan_reference(
+                table_fqn, project_id, location, scan_client
+            )
+
+            table_scan_references = [ref for ref in table_scan_references if ref]
+            if table_scan_references:
+                # List the jobs of every scan concurrently
+                jobs_per_scan = scan_job_executor.map(
+                    lambda ref: _list_latest_succeeded_jobs(scan_client, ref, history),
+                    table_scan_references,
+                )
+                job_names = [job.name for jobs in jobs_per_scan for job in jobs]
+
+                # Fetch the FULL view of every selected job concurrently,
+                # unless its formatted result is already cached; map()
+                # yields them back in scan and job order
+                job_results = scan_job_executor.map(
+                    lambda job_name: _fetch_formatted_scan_job(scan_client, job_name),
+                    job_names,
+                )
+
+                for job_result in job_results:
+                    if job_result is None:
+                        continue
+                    if job_result["data_quality"]:
+                        data_quality_results.append(job_result["data_quality"])
+                    if job_result["data_profile"]:
+                        data_profile_results.append(job_result["data_profile"])
+
+            # logger.info(f"Final profile results: {data_profile_results}")
+            # logger.info(f"Final quality results: {data_quality_results}")
+
+            return {
+                "data_profile": data_profile_results,
+                "data_quality": data_quality_results,
+            }
+        else:
+            return {
+                "data_profile": [],
+                "data_quality": [],
+            }
+    except Exception as e:
+        logger.error(f"Exception: {e}")
+        raise e
+
+
+lineage_process_cache = LRUCache(
+    max_entries=LINEAGE_PROCESS_CACHE_MAX_ENTRIES,
+    ttl_seconds=LINEAGE_PROCESS_CACHE_TTL_SECONDS,
+)
+
+
+def _get_process_info(lineage_client, process_name: str) -> Dict:
+    """Returns the id, SQL and timestamps of a lineage process, cached by name"""
+    process_info = lineage_process_cache.get(process_name)
+    if process_info is not None:
+        metrics.cache_lookup("lineage_processes", "hit")
+        return process_info
+    metrics.cache_lookup("lineage_processes", "miss")
+
+    process_details = lineage_client.get_process(
+        request=datacatalog_lineage_v1.GetProcessRequest(name=process_name),
+        timeout=RPC_TIMEOUT_SECONDS,
+    )
+
+    # Create process info with safer field access
+    process_info = {
+        "id": process_details.attributes.get("bigquery_job_id", "unknown"),
+        "sql": process_details.display_name,
+    }
+
+    # Only add timestamps if they exist in the attributes
+    if "start_time" in process_details.attributes:
+        process_info["start_time"] = process_details.attributes["start_time"]
+    if "end_time" in process_details.attributes:
+        process_info["end_time"] = process_details.attributes["end_time"]
+
+    lineage_process_cache.put(process_name, process_info)
+    return process_info
+
+
+def _get_link_processes(lineage_client, parent: str, link_names: List[str]):
+    """Resolves the processes behind a set of lineage links.
+
+    Links are sent in BatchSearchLinkProcesses calls of up to
+    LINEAGE_LINKS_PER_BATCH links, and the details of each distinct process
+    are then fetched concurrently. Processes are returned in the order the
+    batch searches report them.
+    """
+    if not link_names:
+        return []
+
+    batches = [
+        link_names[i : i + LINEAGE_LINKS_PER_BATCH]
+        for i in range(0, len(link_names), LINEAGE_LINKS_PER_BATCH)
+    ]
+
+    def search_batch(links):
+        return [
+            process.process
+            for process in lineage_client.batch_search_link_processes(
+                request=datacatalog_lineage_v1.BatchSearchLinkProcessesRequest(
+                    parent=parent,
+                    links=links,
+                ),
+                timeout=RPC_TIMEOUT_SECONDS,
+            )
+        ]
+
+    process_names = list(
+        dict.fromkeys(
+            process_name
+            for batch_process_names in lineage_executor.map(search_batch, batches)
+            for process_name in batch_process_names
+        )
+    )
+    return list(
+        lineage_executor.map(
+            lambda process_name: _get_process_info(lineage_client, process_name),
+            process_names,
+        )
+    )
+
+
+def _build_table_lineage(table_entry, project_id, location, lineage_client):
+    """Builds the immediate upstream sources and processes of an indexed table.
+
+    Concurrent builds for the same table share one execution.
+    """
+    return single_flight.do(
+        ("table_lineage", project_id, location, table_entry["table_fqn"]),
+        _load_table_lineage,
+        table_entry,
+        project_id,
+        location,
+        lineage_client,
+    )
+
+
+def _load_table_lineage(table_entry, project_id, location, lineage_client):
+    # Get the table's fully qualified name for lineage lookup
+    target_fqn = f"bigquery:{table_entry['table_fqn']}"
+    parent = f"projects/{project_id}/locations/{location}"
+
+    sources = []
+    link_names = []
+
+    with metrics.phase("lineage.links"):
+        links = _search_lineage_links(lineage_client, parent, target_fqn, "upstream")
+    for source, target, link_name in links:
+        if target == target_fqn:
+            source_table = source.replace("bigquery:", "")
+            sources.append(source_table)
+            link_names.append(link_name)
+
+    # Get process information for all links at once
+    with metrics.phase("lineage.processes"):
+        processes = _get_link_processes(lineage_client, parent, link_names)
+
+    return {"sources": sources, "processes": processes}
+
+
+@app.get("/api/data-products/{table_id}/lineage")
+async def get_table_lineage(table_id: str, project_id: str, location: str):
+    """Get lineage information for a BigQuery table"""
+    try:
+        try:
+            # Find the specific table entry
+            table_entry = await _run_blocking(
+                table_index.lookup, project_id, location, table_id
+            )
+
+            if not table_entry:
+                logger.warning(f"No matching entry found for table_id: {table_id}")
+                return {"sources": [], "processes": []}
+
+            try:
+                return await _run_blocking(
+                    lambda: _build_table_lineage(
+                        table_entry, project_id, location, clients.lineage()
+                    )
+                )
+
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                logger.error(f"Error getting lineage details: {str(e)}")
+                return {"sources": [], "processes": []}
+
+        except google_exceptions.NotFound as e:
+            logger.warning(f"Entry not found: {str(e)}")
+            return {"sources": [], "processes": []}
+
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    except Exception as e:
+        logger.error(f"Error getting table lineage: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error getting table lineage: {str(e)}"
+        )
+
+
+def _search_lineage_links(lineage_client, parent: str, fqn: str, direction: str):
+    """Returns (source FQN, target FQN, link name) of the links next to an
+    entity.
+
+    direction is "upstream" (links that end at the entity) or "downstream"
+    (links that start from it). With a CatalogStore, the links are persisted
+    and reused until they are older than CATALOG_STORE_LINEAGE_TTL_SECONDS.
+    """
+    namespace = parent.split("/")[1], parent.split("/")[3]
+    store_key = f"{direction}:{fqn}"
+    if catalog_store is not None:
+        try:
+            stored = catalog_store.load("lineage_edges", *namespace, store_key)
+        except Exception as e:
+            logger.warning(f"Error reading persisted lineage edges: {str(e)}")
+            stored = None
+        if stored is not None and stored[1] <= CATALOG_STORE_LINEAGE_TTL_SECONDS:
+            metrics.cache_lookup("lineage_edges", "hit")
+            return [tuple(link) for link in stored[0]]
+        metrics.cache_lookup("lineage_edges", "miss")
+
+    entity = datacatalog_lineage_v1.EntityReference(fully_qualified_name=fqn)
+    if direction == "upstream":
+        request = datacatalog_lineage_v1.SearchLinksRequest(
+            parent=parent, target=entity
+        )
+    else:
+        request = datacatalog_lineage_v1.SearchLinksRequest(
+            parent=parent, source=entity
+        )
+
+    links = [
+        (link.source.fully_qualified_name, link.target.fully_qualified_name, link.name)
+        for link in lineage_client.search_links(
+            request=request, timeout=RPC_TIMEOUT_SECONDS
+        )
+    ]
+    if catalog_store is not None:
+        try:
+            catalog_store.save("lineage_edges", *namespace, links, key=store_key)
+        except Exception as e:
+            logger.warning(f"Error persisting lineage edges: {str(e)}")
+    return links
+
+
+def _walk_lineage_graph(
+    lineage_client,
+    parent: str,
+    root_fqn: str,
+    directions: List[str],
+    depth: int,
+    max_nodes: int,
+    max_edges: int,
+    time_budget_seconds: float,
+) -> Dict:
+    """Breadth-first lineage traversal from root_fqn.
+
+    Every frontier is expanded with concurrent SearchLinks calls. The walk
+    stops at `depth` hops, or as soon as the node, edge or time budget is
+    exhausted, in which case the graph is flagged as truncated.
+    """
+    deadline = time.monotonic() + time_budget_seconds
+    nodes = {root_fqn: 0}
+    edges = {}
+    truncated = None
+
+    futures = []
+    try:
+        frontier = [(root_fqn, direction) for direction in directions]
+        for hop in range(1, depth + 1):
+            if not frontier:
+                break
+
+            futures = [
+                lineage_executor.submit(
+                    _search_lineage_links, lineage_client, parent, fqn, direction
+                )
+                for fqn, direction in frontier
+            ]
+            done, not_done = wait(futures, timeout=max(0, deadline - time.monotonic()))
+            if not_done:
+                truncated = "time_budget"
+
+            next_frontier = []
+            # Walk futures in frontier order so the graph is deterministic
+            for future, (_, direction) in zip(futures, frontier):
+                if future not in done:
+                    continue
+                try:
+                    links = future.result()
+                except Exception as e:
+                    logger.warning(f"Error searching lineage links: {str(e)}")
+                    continue
+
+                for source, target, _ in links:
+                    if (source, target) in edges:
+                        continue
+                    if len(edges) >= max_edges:
+                        truncated = truncated or "max_edges"
+                        break
+
+                    neighbour = source if direction == "upstream" else target
+                    if neighbour not in nodes:
+                        if len(nodes) >= max_nodes:
+                            truncated = truncated or "max_nodes"
+                            continue
+                        nodes[neighbour] = hop
+                        next_frontier.append((neighbour, direction))
+                    edges[(source, target)] = hop
+
+            if truncated:
+                break
+            frontier = next_frontier
+    finally:
+        # Hand the shared pool back to other requests once the budget is spent
+        for future in futures:
+            future.cancel()
+
+    return {"nodes": nodes, "edges": list(edges), "truncated": truncated}
+
+
+def _table_data_products(project_id: str, location: str) -> Dict:
+    """Maps table FQNs to their data product name using the cached snapshot"""
+    snapshot = catalog_cache.peek(project_id, location)
+    if snapshot is None:
+        return {}
+
+    table_products = {}
+    for data_product in snapshot["data_products"]:
+        for component in data_product.components:
+            parsed = _parse_bq_resource(component.resource)
+            if parsed:
+                table_products[".".join(parsed)] = data_product.name
+    return table_products
+
+
+@app.get(
+    "/api/data-products/{table_id}/lineage/graph", response_class=FastJSONResponse
+)
+async def get_table_lineage_graph(
+    table_id: str,
+    project_id: str,
+    location: str,
+    direction: str = "upstream",
+    depth: int = 3,
+    max_nodes: int = 500,
+    max_edges: int = 2000,
+    time_budget_seconds: float = LINEAGE_GRAPH_TIME_BUDGET_SECONDS,
+):
+    """Get the multi-hop lineage graph of a BigQuery table.
+
+    direction is "upstream", "downstream" or "both". Nodes carry their hop
+    distance from the table and, when known, their data product.
+    """
+    if direction not in ("upstream", "downstream", "both"):
+        raise HTTPException(
+            status_code=400,
+            detail="direction must be one of: upstream, downstream, both",
+        )
+
+    try:
+        table_entry = await _run_blocking(
+            table_index.lookup, project_id, location, table_id
+        )
+        if not table_entry:
+            logger.warning(f"No matching entry found for table_id: {table_id}")
+            return {"root": None, "nodes": [], "edges": [], "truncated": None}
+
+        root_fqn = f"bigquery:{table_entry['table_fqn']}"
+        with metrics.phase("lineage_graph.walk"):
+            graph = await _run_blocking(
+                lambda: _walk_lineage_graph(
+                    clients.lineage(),
+                    f"projects/{project_id}/locations/{location}",
+                    root_fqn,
+                    ["upstream", "downstream"] if direction == "both" else [direction],
+                    depth=max(1, min(depth, LINEAGE_GRAPH_MAX_DEPTH)),
+                    max_nodes=max(1, max_nodes),
+                    max_edges=max(0, max_edges),
+                    time_budget_seconds=max(
+                        0.0,
+                        min(time_budget_seconds, LINEAGE_GRAPH_TIME_BUDGET_SECONDS),
+                    ),
+                )
+            )
+
+        # Restoring a persisted snapshot reads the whole catalog from disk
+        table_products = await _run_blocking(
+            _table_data_products, project_id, location
+        )
+
+        def node_id(fqn):
+            return fqn.replace("bigquery:", "")
+
+        return FastJSONResponse(
+            {
+                "root": node_id(root_fqn),
+                "nodes": [
+                    {
+                        "id": node_id(fqn),
+                        "depth": hop,
+                        "data_product": table_products.get(node_id(fqn)),
+                    }
+                    for fqn, hop in graph["nodes"].items()
+                ],
+                "edges": [
+                    {"source": node_id(source), "target": node_id(target)}
+                    for source, target in graph["edges"]
+                ],
+                "truncated": graph["truncated"],
+            }
+        )
+
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    except Exception as e:
+        logger.error(f"Error getting table lineage graph: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error getting table lineage graph: {str(e)}"
+        )
+
+
+def _find_component_table(project_id: str, location: str, component: Component):
+    """Finds the indexed table entry of a data product component"""
+    parsed = _parse_bq_resource(component.resource)
+    if parsed:
+        table_entry = table_index.lookup(project_id, location, ".".join(parsed))
+        if table_entry:
+            return table_entry
+    return table_index.lookup(project_id, location, component.id)
+
+
+def _product_table_components(data_product: DataProduct) -> List[Component]:
+    """Return the BigQuery table components of a data product"""
+    return [
+        component
+        for component in data_product.components
+        if component.system.upper() == "BIGQUERY" and "table" in component.type.lower()
+    ]
+
+
+def _build_component_details(
+    component: Component, project_id, location, scan_client, lineage_client, history
+) -> Dict:
+    """Resolves the profile and lineage of one data product component"""
+    details = {
+        "profile": {"data_profile": [], "data_quality": [], "schema": None},
+        "lineage": {"sources": [], "processes": []},
+    }
+    try:
+        table_entry = _find_component_table(project_id, location, component)
+        if not table_entry:
+            logger.warning(f"No matching entry found for component {component.id}")
+            return details
+
+        details["profile"] = _build_table_profile(
+            table_entry, project_id, location, scan_client, history
+        )
+        try:
+            details["lineage"] = _build_table_lineage(
+                table_entry, project_id, location, lineage_client
+            )
+        except Exception as e:
+            logger.error(f"Error getting lineage details: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error getting details of {component.id}: {str(e)}")
+        details["error"] = str(e)
+    return details
+
+
+def _build_components_details(components, project_id, location, history):
+    """Resolves the details of several components concurrently, in order"""
+    if not components:
+        return []
+
+    scan_client = clients.data_scans()
+    lineage_client = clients.lineage()
+    return list(
+        component_executor.map(
+            lambda component: _build_component_details(
+                component,
+                project_id,
+                location,
+                scan_client,
+                lineage_client,
+                history,
+            ),
+            components,
+        )
+    )
+
+
+@app.get(
+    "/api/data-products/{product_id}/details", response_class=FastJSONResponse
+)
+async def get_data_product_details(
+    product_id: str, project_id: str, location: str, history: int = 1
+):
+    """Get the profile and lineage of every component of a data product.
+
+    Components are resolved concurrently in one server-side pass sharing the
+    catalog snapshot, the table and scan indexes and the API clients. The
+    payload of each component matches the /profile and /lineage endpoints.
+    """
+    try:
+        history = max(1, min(history, PROFILE_HISTORY_MAX))
+        snapshot = await _run_blocking(catalog_cache.get, project_id, location)
+        data_product = next(
+            (dp for dp in snapshot["data_products"] if dp.id == product_id), None
+        )
+        if data_product is None:
+            raise HTTPException(
+                status_code=404, detail=f"Data product not found: {product_id}"
+            )
+
+        components = _product_table_components(data_product)
+
+        with metrics.phase("details.components"):
+            component_details = await _run_blocking(
+                _build_components_details, components, project_id, location, history
+            )
+
+        return FastJSONResponse(
+            {
+                "id": data_product.id,
+                "components": {
+                    component.id: details
+                    for component, details in zip(components, component_details)
+                },
+            }
+        )
+
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    except Exception as e:
+        logger.error(f"Error getting data product details: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error getting data product details: {str(e)}"
+        )
+
+
+def _summarize_component(table_fqn: str, jobs, results) -> Dict:
+    """Reduce the latest profile and quality results of a table to the
+    figures rolled up per data product.
+
+    A table may have several scans of each type: their rules and failures
+    add up, dimension scores are averaged and each column keeps its highest
+    null ratio.
+    """
+    dimension_scores = defaultdict(list)
+    column_null_ratios = {}
+    summary = {
+        "table": table_fqn,
+        "row_count": None,
+        "quality_rows": None,
+        "dimensions": {},
+        "rules": 0,
+        "failing_rules": Counter(),
+        "null_ratios": [],
+        "last_scan_time": max(
+            (job.end_time for job in jobs if job.end_time), default=None
+        ),
+    }
+    for result in results:
+        if result is None:
+            continue
+        profile = result["data_profile"]
+        if profile:
+            row_count = profile["rowCount"]
+            summary["row_count"] = max(row_count, summary["row_count"] or 0)
+            for field in profile["fields"]:
+                null_ratio = field.get("nullRatio")
+                if null_ratio is None:
+                    null_ratio = field["nullCount"] / row_count if row_count else 0.0
+                if null_ratio > column_null_ratios.get(field["name"], 0.0):
+                    column_null_ratios[field["name"]] = null_ratio
+        quality = result["data_quality"]
+        if quality:
+            for dimension in quality["dimensions"]:
+                dimension_scores[dimension["dimension"]["name"]].append(
+                    dimension["score"]
+                )
+            summary["rules"] += len(quality["rules"])
+            summary["failing_rules"].update(
+                rule["dimension"] for rule in quality["rules"] if not rule["passed"]
+            )
+            quality_rows = [rule["evaluatedCount"] for rule in quality["rules"]]
+            if summary["quality_rows"] is not None:
+                quality_rows.append(summary["quality_rows"])
+            summary["quality_rows"] = max(quality_rows, default=None)
+    summary["dimensions"] = {
+        name: sum(scores) / len(scores) for name, scores in dimension_scores.items()
+    }
+    summary["null_ratios"] = heapq.nlargest(
+        PRODUCT_ROLLUP_NULL_HOTSPOTS,
+        ((null_ratio, name) for name, null_ratio in column_null_ratios.items()),
+    )
+    return summary
+
+
+def _aggregate_rollup(data_product: DataProduct, summaries) -> Dict:
+    """Combine the component summaries of a data product into its rollup.
+
+    Dimension scores are averaged over the components reporting them,
+    weighted by row count (the profiled row count, else the rows evaluated by
+    the quality rules, each component weighing at least 1).
+    """
+    scanned = [summary for summary in summaries if summary is not None]
+    dimension_totals = defaultdict(lambda: [0.0, 0.0, 0])
+    failing_rules = Counter()
+    null_hotspots = []
+    scan_times = []
+    for summary in scanned:
+        weight = max(1, summary["row_count"] or summary["quality_rows"] or 1)
+        for name, score in summary["dimensions"].items():
+            totals = dimension_totals[name]
+            totals[0] += score * weight
+            totals[1] += weight
+            totals[2] += 1
+        failing_rules.update(summary["failing_rules"])
+        null_hotspots.extend(
+            (null_ratio, summary["table"], column)
+            for null_ratio, column in summary["null_ratios"]
+        )
+        if summary["last_scan_time"] is not None:
+            scan_times.append(summary["last_scan_time"])
+
+    row_counts = [s["row_count"] for s in scanned if s["row_count"] is not None]
+    return {
+        "id": data_product.id,
+        "components": len(summaries),
+        "scanned_components": sum(
+            1 for summary in scanned if summary["last_scan_time"] is not None
+        ),
+        "row_count": sum(row_counts) if row_counts else None,
+        "dimensions": [
+            {"name": name, "score": score / weight, "components": components}
+            for name, (score, weight, components) in sorted(dimension_totals.items())
+        ],
+        "rules": {
+            "total": sum(summary["rules"] for summary in scanned),
+            "failing": sum(failing_rules.values()),
+            "failing_by_dimension": dict(sorted(failing_rules.items())),
+        },
+        "null_hotspots": [
+            {"table": table, "column": column, "null_ratio": null_ratio}
+            for null_ratio, table, column in heapq.nlargest(
+                PRODUCT_ROLLUP_NULL_HOTSPOTS, null_hotspots
+            )
+        ],
+        "freshness": {
+            "latest_scan_time": max(scan_times).isoformat() if scan_times else None,
+            "oldest_scan_time": min(scan_times).isoformat() if scan_times else None,
+        },
+        "computed_at": datetime.now().isoformat(),
+    }
+
+
+class ProductRollupCache:
+    """Quality and profile rollups of data products, keyed by
+    (project_id, location, data product id).
+
+    A rollup aggregates the latest succeeded profile and quality jobs of
+    every BigQuery table of a data product. Refreshing it only lists the
+    latest job of each scan: a table is summarized again only when the names
+    of its latest jobs changed, and the rollup is recomputed only when one of
+    its table summaries did. Rollups older than the TTL are served while a
+    background thread refreshes them.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self._ttl_seconds = ttl_seconds
+        self._rollups = {}
+        self._components = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get_many(
+        self, project_id: str, location: str, data_products: List[DataProduct]
+    ) -> Dict[str, Dict]:
+        """Return the rollups of several data products, keyed by id"""
+        rollups = {}
+        missing = []
+        stale = []
+        now = time.monotonic()
+        with self._lock:
+            for data_product in data_products:
+                cached = self._rollups.get((project_id, location, data_product.id))
+                if cached is None:
+                    missing.append(data_product)
+                    continue
+                rollups[data_product.id] = cached["rollup"]
+                if now - cached["checked_at"] > self._ttl_seconds:
+                    stale.append(data_product)
+        metrics.cache_lookup("product_rollups", "miss", len(missing))
+        metrics.cache_lookup("product_rollups", "stale", len(stale))
+        metrics.cache_lookup(
+            "product_rollups", "hit", len(data_products) - len(missing) - len(stale)
+        )
+
+        if stale:
+            self._refresh_in_background(project_id, location, stale)
+        if missing:
+            rollups.update(
+                single_flight.do(
+                    ("product_rollups", project_id, location)
+                    + tuple(data_product.id for data_product in missing),
+                    self._refresh,
+                    project_id,
+                    location,
+                    missing,
+                )
+            )
+        return rollups
+
+    def invalidate(self, project_id: str = None, location: str = None):
+        with self._lock:
+            for cache in (self._rollups, self._components):
+                for key in list(cache):
+                    if (project_id is None or key[0] == project_id) and (
+                        location is None or key[1] == location
+                    ):
+                        del cache[key]
+
+    def _refresh_in_background(self, project_id, location, data_products):
+        with self._lock:
+            data_products = [
+                dp
+                for dp in data_products
+                if (project_id, location, dp.id) not in self._refreshing
+            ]
+            self._refreshing.update(
+                (project_id, location, dp.id) for dp in data_products
+            )
+        if not data_products:
+            return
+
+        def _refresh():
+            try:
+                self._refresh(project_id, location, data_products)
+            except Exception as e:
+                logger.error(f"Background product rollup refresh failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update(
+                        (project_id, location, dp.id) for dp in data_products
+                    )
+
+        threading.Thread(
+            target=_refresh, name=f"product-rollup-{project_id}", daemon=True
+        ).start()
+
+    def _refresh(self, project_id, location, data_products) -> Dict[str, Dict]:
+        """Summarize the tables of several data products concurrently and
+        recompute the rollups whose table summaries changed"""
+        scan_client = clients.data_scans()
+        components = {
+            (data_product.id, component.id): component
+            for data_product in data_products
+            for component in _product_table_components(data_product)
+        }
+        with metrics.phase("product_rollups.refresh"):
+            summaries = dict(
+                zip(
+                    components,
+                    component_executor.map(
+                        lambda component: self._summarize(
+                            project_id, location, component, scan_client
+                        ),
+                        components.values(),
+                    ),
+                )
+            )
+
+        rollups = {}
+        checked_at = time.monotonic()
+        for data_product in data_products:
+            product_summaries = [
+                summaries[(data_product.id, component.id)]
+                for component in _product_table_components(data_product)
+            ]
+            key = (project_id, location, data_product.id)
+            with self._lock:
+                cached = self._rollups.get(key)
+            # A table summary is the same object until the table's latest
+            # jobs change, so unchanged products keep their rollup
+            signature = [id(summary) for summary in product_summaries]
+            if cached is not None and cached["signature"] == signature:
+                rollup = cached["rollup"]
+            else:
+                rollup = _aggregate_rollup(data_product, product_summaries)
+            with self._lock:
+                self._rollups[key] = {
+                    "rollup": rollup,
+                    "summaries": product_summaries,
+                    "signature": signature,
+                    "checked_at": checked_at,
+                }
+            rollups[data_product.id] = rollup
+        return rollups
+
+    def _summarize(self, project_id, location, component: Component, scan_client):
+        try:
+            table_entry = _find_component_table(project_id, location, component)
+            if not table_entry:
+                return None
+            # Products refreshed concurrently may share tables
+            return single_flight.do(
+                ("table_rollup", project_id, location, table_entry["table_fqn"]),
+                self._summarize_table,
+                project_id,
+                location,
+                table_entry["table_fqn"],
+                scan_client,
+            )
+        except Exception as e:
+            logger.error(f"Error summarizing component {component.id}: {str(e)}")
+            return None
+
+    def _summarize_table(self, project_id, location, table_fqn: str, scan_client):
+        key = (project_id, location, table_fqn)
+        with self._lock:
+            cached = self._components.get(key)
+        if cached is not None and time.monotonic() - cached[2] <= self._ttl_seconds:
+            # Checked recently, e.g. for another product sharing the table
+            return cached[1]
+
+        jobs = [
+            job
+            for scan_name in _get_table_scan_reference(
+                table_fqn, project_id, location, scan_client
+            )
+            for job in _list_latest_succeeded_jobs(scan_client, scan_name, 1)
+        ]
+        job_names = tuple(job.name for job in jobs)
+        if cached is not None and cached[0] == job_names:
+            summary = cached[1]
+        else:
+            summary = _summarize_component(
+                table_fqn,
+                jobs,
+                [_fetch_formatted_scan_job(scan_client, name) for name in job_names],
+            )
+        with self._lock:
+            self._components[key] = (job_names, summary, time.monotonic())
+        return summary
+
+
+product_rollups = ProductRollupCache(ttl_seconds=PRODUCT_ROLLUP_TTL_SECONDS)
+
+
+def _product_rollups(project_id: str, location: str, product_ids) -> Dict:
+    snapshot = catalog_cache.get(project_id, location)
+    data_products = snapshot["data_products"]
+    if product_ids is not None:
+        data_products = [dp for dp in data_products if dp.id in product_ids]
+    return product_rollups.get_many(project_id, location, data_products)
+
+
+@app.get("/api/data-products/rollups", response_class=FastJSONResponse)
+async def get_data_product_rollups(project_id: str, location: str, ids: str = None):
+    """Get the quality and profile rollups of data products.
+
+    `ids` is a comma separated list of data product ids; without it every
+    data product is rolled up. Unknown ids are left out of the response.
+    """
+    product_ids = None
+    if ids is not None:
+        product_ids = {id.strip() for id in ids.split(",") if id.strip()}
+
+    try:
+        rollups = await _run_blocking(
+            _product_rollups, project_id, location, product_ids
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    except Exception as e:
+        logger.error(f"Error getting data product rollups: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error getting data product rollups: {str(e)}"
+        )
+    return FastJSONResponse({"rollups": rollups})
+
+
+@app.get(
+    "/api/data-products/{product_id}/rollup", response_class=FastJSONResponse
+)
+async def get_data_product_rollup(product_id: str, project_id: str, location: str):
+    """Get the quality and profile rollup of one data product: weighted
+    dimension scores, failing rules, row count, null-ratio hotspots and the
+    freshness of its latest scans"""
+    try:
+        rollups = await _run_blocking(
+            _product_rollups, project_id, location, {product_id}
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=_TIMEOUT_DETAIL)
+    except Exception as e:
+        logger.error(f"Error getting data product rollup: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error getting data product rollup: {str(e)}"
+        )
+    if product_id not in rollups:
+        raise HTTPException(
+            status_code=404, detail=f"Data product not found: {product_id}"
         )
+    return FastJSONResponse(rollups[product_id])
 
 
 @app.get("/")
@@ -738,8 +4509,15 @@ async def root():
         "version": "1.0",
         "endpoints": {
             "data_products": "/api/data-products",
+            "data_products_invalidate": "/api/data-products/invalidate",
+            "search": "/api/search",
             "data_product_profile": "/api/data-products/{table_id}/profile",
             "data_product_lineage": "/api/data-products/{table_id}/lineage",
+            "data_product_lineage_graph": "/api/data-products/{table_id}/lineage/graph",
+            "data_product_details": "/api/data-products/{product_id}/details",
+            "data_product_rollup": "/api/data-products/{product_id}/rollup",
+            "data_product_rollups": "/api/data-products/rollups",
+            "metrics": "/metrics",
             "docs": "/docs",
             "openapi": "/openapi.json",
         },
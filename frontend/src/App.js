@@ -14,6 +14,61 @@ import { clearCacheByPrefix } from './utils/cache';
 const CACHE_KEY = 'dataProductsCache';
 const CACHE_DURATION = 1000 * 60 * 60; // 1 hour in milliseconds
 
+// Merge a streamed batch of data products into the products received so far;
+// a data product spread over several entry groups arrives in several batches
+const mergeDataProducts = (productsById, batch) => {
+    batch.forEach(product => {
+        const existing = productsById[product.id];
+        if (!existing) {
+            productsById[product.id] = product;
+            return;
+        }
+        productsById[product.id] = {
+            ...existing,
+            kind: existing.kind === 'source-aligned' ? product.kind : existing.kind,
+            team: existing.team === 'Unassigned' ? product.team : existing.team,
+            components: [...existing.components, ...product.components],
+            tags: [...new Set([...existing.tags, ...product.tags])],
+            created_at: existing.created_at < product.created_at ? existing.created_at : product.created_at
+        };
+    });
+};
+
+const readDataProductsStream = async (response, onBatch) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const productsById = {};
+    let buffer = '';
+
+    const handleLine = (line) => {
+        if (!line.trim()) {
+            return;
+        }
+        const message = JSON.parse(line);
+        if (message.type === 'error') {
+            throw new Error(message.detail || 'Failed to fetch data products');
+        }
+        if (message.type === 'data_products') {
+            mergeDataProducts(productsById, message.data_products);
+            onBatch(Object.values(productsById));
+        }
+    };
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(handleLine);
+    }
+    handleLine(buffer);
+
+    return Object.values(productsById);
+};
+
 function App() {
     const [dataProducts, setDataProducts] = useState([]);
     const [loading, setLoading] = useState(false);
@@ -57,7 +112,7 @@ function App() {
             }
 
             const response = await fetch(
-                `http://localhost:8000/api/data-products?project_id=${config.project_id}&location=${config.location}`
+                `http://localhost:8000/api/data-products?project_id=${config.project_id}&location=${config.location}&stream=true${forceRefresh ? '&refresh=true' : ''}`
             );
 
             if (!response.ok) {
@@ -65,8 +120,11 @@ function App() {
                 throw new Error(errorData.detail || 'Failed to fetch data products');
             }
 
-            const data = await response.json();
-            const products = data.data_products || [];
+            // Render data products as soon as each batch is streamed in
+            const products = await readDataProductsStream(response, (partialProducts) => {
+                setDataProducts(partialProducts);
+                setLoading(false);
+            });
 
             const existingProducts = JSON.parse(localStorage.getItem('dataProducts') || '[]');
             const mergedProducts = products.map(newProduct => {
@@ -341,94 +341,88 @@ function DataProductDetail({ dataProducts }) {
     const product = dataProducts.find(p => p.id === id);
 
     useEffect(() => {
-        const fetchData = async (component) => {
-            const isBigQueryTable =
-                component.source.system === "BIGQUERY" &&
-                component.type.toLowerCase().includes('table');
-
-            if (isBigQueryTable) {
-                setLoadingStates(prev => ({
+        const fetchData = async (components) => {
+            const componentIds = components.map(component => component.id);
+            const setComponentStates = (setter, value) => {
+                setter(prev => ({
                     ...prev,
-                    [component.id]: true
+                    ...Object.fromEntries(componentIds.map(componentId => [componentId, value]))
                 }));
+            };
 
-                try {
-                    const config = JSON.parse(localStorage.getItem('dataplexConfig') || '{}');
-
-                    if (!config.project_id || !config.location) {
-                        throw new Error('Missing configuration');
-                    }
+            setComponentStates(setLoadingStates, true);
 
-                    // Check cache for profile and lineage data
-                    let profileData = getCachedData(`profileDataCache_${component.id}`);
-                    let lineageData = getCachedData(`lineageDataCache_${component.id}`);
-
-                    // Fetch any uncached data
-                    if (!profileData || !lineageData) {
-                        const [profileResponse, lineageResponse] = await Promise.all([
-                            !profileData && fetch(`http://localhost:8000/api/data-products/${component.id}/profile?project_id=${config.project_id}&location=${config.location}`),
-                            !lineageData && fetch(`http://localhost:8000/api/data-products/${component.id}/lineage?project_id=${config.project_id}&location=${config.location}`)
-                        ].filter(Boolean));
-
-                        if ((profileResponse && !profileResponse.ok) || (lineageResponse && !lineageResponse.ok)) {
-                            throw new Error('Failed to fetch data');
-                        }
+            try {
+                const config = JSON.parse(localStorage.getItem('dataplexConfig') || '{}');
 
-                        // Get fresh profile data if needed
-                        if (profileResponse) {
-                            profileData = await profileResponse.json();
-                            setCachedData(`profileDataCache_${component.id}`, profileData);
-                        }
+                if (!config.project_id || !config.location) {
+                    throw new Error('Missing configuration');
+                }
 
-                        // Get fresh lineage data if needed
-                        if (lineageResponse) {
-                            lineageData = await lineageResponse.json();
-                            console.log('Raw lineage response:', lineageData);
+                // Check cache for profile and lineage data
+                const cachedProfiles = {};
+                const cachedLineage = {};
+                components.forEach(component => {
+                    cachedProfiles[component.id] = getCachedData(`profileDataCache_${component.id}`);
+                    cachedLineage[component.id] = getCachedData(`lineageDataCache_${component.id}`);
+                });
+
+                // Fetch the details of every component in a single request
+                // unless all of them are cached
+                const hasUncachedData = components.some(component =>
+                    !cachedProfiles[component.id] || !cachedLineage[component.id]
+                );
+
+                if (hasUncachedData) {
+                    const response = await fetch(`http://localhost:8000/api/data-products/${encodeURIComponent(product.id)}/details?project_id=${config.project_id}&location=${config.location}`);
+
+                    if (!response.ok) {
+                        throw new Error('Failed to fetch data');
+                    }
 
-                            // Set the lineage data directly without wrapping
-                            setLineageData(prev => ({
+                    const details = await response.json();
+                    Object.entries(details.components || {}).forEach(([componentId, componentDetails]) => {
+                        if (componentDetails.error) {
+                            setErrors(prev => ({
                                 ...prev,
-                                [component.id]: lineageData  // Remove the extra lineage wrapper
+                                [componentId]: componentDetails.error
                             }));
-
-                            setCachedData(`lineageDataCache_${component.id}`, lineageData);
+                            return;
                         }
-                    }
-
-                    setProfileData(prev => ({
-                        ...prev,
-                        [component.id]: profileData
-                    }));
+                        cachedProfiles[componentId] = componentDetails.profile;
+                        cachedLineage[componentId] = componentDetails.lineage;
+                        setCachedData(`profileDataCache_${componentId}`, componentDetails.profile);
+                        setCachedData(`lineageDataCache_${componentId}`, componentDetails.lineage);
+                    });
+                }
 
-                    setLineageData(prev => ({
-                        ...prev,
-                        [component.id]: lineageData
-                    }));
+                setProfileData(prev => ({
+                    ...prev,
+                    ...cachedProfiles
+                }));
 
-                    // Add debug log after setting lineage data
-                    if (lineageData) {
-                        console.log('Lineage data received for component:', component.id, lineageData);
-                    }
+                setLineageData(prev => ({
+                    ...prev,
+                    ...cachedLineage
+                }));
 
-                } catch (error) {
-                    console.error('Error fetching data:', error);
-                    setErrors(prev => ({
-                        ...prev,
-                        [component.id]: error.message
-                    }));
-                } finally {
-                    setLoadingStates(prev => ({
-                        ...prev,
-                        [component.id]: false
-                    }));
-                }
+            } catch (error) {
+                console.error('Error fetching data:', error);
+                setComponentStates(setErrors, error.message);
+            } finally {
+                setComponentStates(setLoadingStates, false);
             }
         };
 
         if (product) {
-            product.components.forEach(component => {
-                fetchData(component);
-            });
+            const bigQueryTables = product.components.filter(component =>
+                component.source.system === "BIGQUERY" &&
+                component.type.toLowerCase().includes('table')
+            );
+
+            if (bigQueryTables.length > 0) {
+                fetchData(bigQueryTables);
+            }
         }
     }, [product]);
 